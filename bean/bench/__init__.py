@@ -0,0 +1 @@
+from .mold import MoldBench
@@ -0,0 +1,45 @@
+import argparse
+import json
+import sys
+
+from .mold import MoldBench
+
+
+BENCHES = {
+    'mold' : MoldBench,
+}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(prog='python -m bean.bench')
+    parser.add_argument('bench', choices=list(BENCHES))
+    parser.add_argument('--spheres', type=int, nargs='+')
+    parser.add_argument('--dpi', type=int, nargs='+')
+    parser.add_argument('--draft', type=int, nargs='+')
+    parser.add_argument('--opacity', type=str, nargs='+', choices=['opaque', 'translucent'])
+    parser.add_argument('--shadows', type=int, nargs='+', choices=[0, 1])
+    parser.add_argument('--repeat', type=int)
+    parser.add_argument('--warmup', type=int)
+    parser.add_argument('--tolerance', type=float)
+    parser.add_argument('--floor', type=float)
+    parser.add_argument('--runs', type=int)
+    parser.add_argument('--baseline', type=str)
+    parser.add_argument('--output', type=str)
+    parser.add_argument('--save', action='store_true')
+    args = vars(parser.parse_args())
+    bench = BENCHES[args.pop('bench')]
+    output = args.pop('output')
+    save = args.pop('save')
+    bench = bench(**args)
+    baseline = bench.load()
+    results = bench.run(baseline)
+    if output is not None:
+        with open(output, 'w') as file:
+            json.dump(results, file, indent=2, sort_keys=True)
+    if save:
+        bench.save(results)
+    regressions = bench.regressions(results, baseline)
+    print(f'drift: {bench.drift(bench.compare(results, baseline)):.2f}x')
+    for name in regressions:
+        print(f'regression: {name}')
+    sys.exit(1 if regressions else 0)
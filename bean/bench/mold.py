@@ -0,0 +1,228 @@
+import itertools
+import json
+import os.path as osp
+import resource
+import time
+import numpy as np
+import numpy.random as npr
+from concurrent.futures import ProcessPoolExecutor
+from typing_extensions import Self
+
+from ..mold import Mold
+
+
+class MoldBench(object):
+
+    '''
+    fundamental variables and function
+    '''
+
+    spheres = [1, 10, 100, 1000, 10000]
+    dpi = [20, 50]
+    draft = [0, 1]
+    opacity = ['opaque', 'translucent']
+    shadows = [1, 0]
+    repeat = 7
+    warmup = 2
+    tolerance = 0.25
+    floor = 5
+    runs = 3
+    drift_scenes = 8
+    seed = 0
+    colours = 16
+    baseline = osp.join(osp.dirname(__file__), 'mold.json')
+
+    _bench_params = {
+        'spheres' : int,
+        'dpi' : int,
+        'draft' : int,
+        'opacity' : str,
+        'shadows' : int,
+    }
+    _figsize = (8, 6)
+
+    def __init__(
+            self: Self,
+            **kwargs,
+        ) -> None:
+        # initiate the benchmark
+        for key, value in kwargs.items():
+            if value is not None:
+                setattr(self, key, value)
+
+    '''
+    hidden methods
+    '''
+
+    @staticmethod
+    def _name(
+            scene: dict,
+        ) -> str:
+        # unique name of a scene
+        return '-'.join(f'{key}={value}' for key, value in scene.items())
+
+    def _scene(
+            self: Self,
+            spheres: int,
+            dpi: int,
+            draft: int,
+            opacity: str,
+            shadows: bool,
+        ) -> Mold:
+        # builds a mold of random spheres with a constant covered area
+        ml = Mold(figsize=self._figsize, dpi=dpi, draft=draft, shadows=bool(shadows), stats=True)
+        npr.seed(self.seed)
+        scale = 2/spheres**0.5
+        for index in range(spheres):
+            ml.new_sphere(
+                pos=(4*npr.rand() - 2, 4*npr.rand() - 1, npr.rand()),
+                scale=scale*(0.5 + npr.rand()),
+                colour=ml.hsl(npr.randint(self.colours)/self.colours),
+                opacity=0.5 if opacity == 'translucent' and index % 2 else 1,
+            )
+        return ml
+
+    def _frame(
+            self: Self,
+            ml: Mold,
+        ) -> float:
+        # renders a full frame and returns its time
+        ml.set_view()
+        start = time.perf_counter()
+        ml.show()
+        return time.perf_counter() - start
+
+    '''
+    main methods
+    '''
+
+    def scenes(
+            self: Self,
+        ) -> list:
+        # lists the parameters of every scene of the benchmark
+        grid = [
+            [value] if np.isscalar(value) else value
+            for value in [self.spheres, self.dpi, self.draft, self.opacity, self.shadows]
+        ]
+        return [dict(zip(self._bench_params, values)) for values in itertools.product(*grid)]
+
+    def run_scene(
+            self: Self,
+            scene: dict,
+        ) -> dict:
+        # times a scene and measures its stages and the growth of the peak memory
+        start_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        ml = self._scene(**scene)
+        for _ in range(self.warmup):
+            self._frame(ml)
+        times = []
+        stages = {}
+        for _ in range(self.repeat):
+            times.append(self._frame(ml))
+            if times[-1] == min(times):
+                stages = {
+                    stage : 1000*record['time']
+                    for stage, record in ml.frame_stats['stages'].items()
+                }
+        return {
+            'ms' : 1000*min(times),
+            'stages' : stages,
+            'peak' : 1024*(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - start_rss),
+        }
+
+    def run(
+            self: Self,
+            baseline: dict = None,
+            verbose: bool = True,
+        ) -> dict:
+        # runs every scene of the benchmark in a few fresh processes and keeps the fastest run
+        if baseline is None:
+            baseline = self.load()
+        results = {}
+        for scene in self.scenes():
+            name = self._name(scene)
+            for _ in range(self.runs):
+                with ProcessPoolExecutor(max_workers=1) as executor:
+                    result = executor.submit(self.run_scene, scene).result()
+                if name not in results or result['ms'] < results[name]['ms']:
+                    results[name] = result
+            if verbose:
+                ratio = self.compare({name : results[name]}, baseline).get(name)
+                print(self.report(name, results[name], ratio), flush=True)
+        return results
+
+    def compare(
+            self: Self,
+            results: dict,
+            baseline: dict = None,
+        ) -> dict:
+        # ratios of the frame times against the baseline
+        if baseline is None:
+            baseline = self.load()
+        return {
+            name : result['ms']/baseline[name]['ms']
+            for name, result in results.items()
+            if name in baseline
+        }
+
+    def drift(
+            self: Self,
+            ratios: dict,
+        ) -> float:
+        # median ratio of the scenes, the slowdown of the whole machine when enough scenes ran
+        if len(ratios) < self.drift_scenes:
+            return 1
+        return float(np.median(list(ratios.values())))
+
+    def regressions(
+            self: Self,
+            results: dict,
+            baseline: dict = None,
+        ) -> list:
+        # scenes slower than the baseline and the drift by more than the tolerance and by more than the floor in ms
+        if baseline is None:
+            baseline = self.load()
+        ratios = self.compare(results, baseline)
+        drift = self.drift(ratios)
+        return sorted(
+            name for name, ratio in ratios.items()
+            if ratio > drift*(1 + self.tolerance)
+            and results[name]['ms'] - drift*baseline[name]['ms'] > self.floor
+        )
+
+    def load(
+            self: Self,
+            path: str = None,
+        ) -> dict:
+        # loads the results of a baseline
+        path = self.baseline if path is None else path
+        if not osp.exists(path):
+            return {}
+        with open(path, 'r') as baseline:
+            return json.load(baseline)
+
+    def save(
+            self: Self,
+            results: dict,
+            path: str = None,
+        ) -> Self:
+        # writes results as a baseline, keeping the scenes that were not run
+        path = self.baseline if path is None else path
+        baseline = self.load(path)
+        baseline.update(results)
+        with open(path, 'w') as file:
+            json.dump(baseline, file, indent=2, sort_keys=True)
+        return self
+
+    @staticmethod
+    def report(
+            name: str,
+            result: dict,
+            ratio: float = None,
+        ) -> str:
+        # one line summary of the result of a scene
+        line = f'{name:<60} {result["ms"]:9.2f}ms {result["peak"]/2**20:8.1f}MiB'
+        if ratio is not None:
+            line += f' {ratio:6.2f}x'
+        stages = ' '.join(f'{stage}={ms:.1f}' for stage, ms in result['stages'].items())
+        return f'{line}  {stages}'
@@ -1,14 +1,35 @@
+import copy
+import functools
 import itertools
+import pickle
+import time
+import tracemalloc
+import weakref
 import numpy as np
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import shared_memory
 from matplotlib.path import Path
+from matplotlib.colors import is_color_like, to_rgba
+from matplotlib.backends.backend_agg import FigureCanvasAgg
 from typing_extensions import Any, Self
-from matplotlib import colormaps
 
 from .brush import Brush
+from .particles import Particles
+from .store import Store
 from .view import View
 from .volume import Volume
 
 
+def _staged(stage):
+    # records a Mold method as a stage of the frame stats
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            return self._record(stage, method, self, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
 class Mold(Brush):
 
     '''
@@ -16,6 +37,17 @@ class Mold(Brush):
     '''
 
     draft = 0
+    zbuffer = False
+    render_dtype = 'float64'
+    threads = 1
+    processes = 1
+    shadow_map = 0
+    antialias = False
+    progressive = 0
+    shadows = True
+    memory_budget = 0
+    stats = False
+    stats_hook = None
     view_dist = 4
     view_height = 5
     view_angle = None
@@ -23,6 +55,7 @@ class Mold(Brush):
     view_rotation = 0
     view_screen = 2
     view_scale = 1
+    view_ortho = 0
     sun_direction = (0.5, 0.25, -1)
     _sun_colour = Brush.hsl(hue=0.15, saturation=1, lightness=0.8)
     _sun_lightness = 0.3
@@ -30,17 +63,53 @@ class Mold(Brush):
     _overshade_shift = 0.1
     _shade_colour = np.array(Brush.hsl(lightness=0)).reshape((1, 3))
     _shade_opacity = 0.1
+    _project_budget = 2**26
+    _tiles_per_thread = 4
+    _dirty_limit = 0.5
+    _shadow_layers = 32
+    _progressive_tol = 1/64
+    _pixel_floats = 32
+    _stats = None
+    _shared_attrs = [
+        'zbuffer',
+        '_sun_lightness',
+        '_sun_darkness',
+        '_overshade_shift',
+        '_shade_colour',
+        '_shade_opacity',
+        '_project_budget',
+        'shadow_map',
+        '_shadow_layers',
+        'antialias',
+        'shadows',
+    ]
+    _worker = {}
 
     _mold_params = {
         'draft' : int,
+        'zbuffer' : bool,
+        'render_dtype' : str,
+        'threads' : int,
+        'processes' : int,
+        'shadow_map' : int,
+        'antialias' : bool,
+        'progressive' : int,
+        'shadows' : bool,
+        'memory_budget' : int,
+        'stats' : bool,
     }
 
     def _init_mold(
             self: Self,
         ) -> Self:
         # new mold instance
-        self._molds = {}
+        self._molds = Store()
         self._mold_index = 0
+        self._pairs = (np.zeros(0, dtype=int), np.zeros(0, dtype=int))
+        self._emitters = {}
+        self._luts = {}
+        self._shadows = {}
+        self._shade_cache = {}
         self.new_image_from_matrix(
             key='_mold_matrix',
             matrix=np.zeros((1, 1, 4)),
@@ -53,7 +122,21 @@ class Mold(Brush):
             1 + mold_dpi*self.figsize[0],
             4,
         )
-        self._matrix = np.zeros(self._matrix_shape).reshape((-1, 4))
+        self._matrix = np.zeros(self._matrix_shape, dtype=self.render_dtype).reshape((-1, 4))
+        scratch = len(self._matrix)
+        if self.memory_budget:
+            scratch = self._chunk_rows()*self._matrix_shape[1]
+        self._block = np.zeros((scratch, 4), dtype=self.render_dtype)
+        self._layer = np.zeros((scratch, 4), dtype=self.render_dtype)
+        self._weight = np.zeros(scratch, dtype=self.render_dtype)
+        self._shared = {}
+        self._frame = 0
+        self._shown = 0
+        self.frame_stats = None
+        self._executor = None
+        self._footprints = None
+        self._overlay = {}
+        weakref.finalize(self, self._close_shared, self._shared)
         self._set_view()
         return self
 
@@ -64,31 +147,85 @@ class Mold(Brush):
     def _set_view(self):
         view_kwargs = {
             'shape' : self._matrix_shape,
-            'direction' : self.unitary(self.sun_direction)
+            'direction' : self.unitary(self.sun_direction),
+            'dtype' : self.render_dtype,
+            'antialias' : self.antialias,
         }
         for param in View.params():
             view_kwargs[param] = getattr(self, 'view_' + param)
         self._view = View(**view_kwargs)
 
-    def _new_mold(
+    def _new_molds(
             self: Self,
-            volume: Volume,
+            pos: np.array,
+            scale: Any = 1,
+            overground: Any = True,
             key: Any = None,
             colour: Any = Brush.hsl(),
-            opacity: float = 1,
-            visible: bool = True,
+            opacity: Any = 1,
+            visible: Any = True,
         ) -> Self:
-        # creates a new mold
-        key, available = self.check_key(key)
-        if available:
-            mold = {
-                'key' : key,
-                'volume' : volume,
-                'cmap' : self.cmap([self._sun_colour, colour, 'black']),
-                'opacity' : opacity,
-                'visible' : visible,
-            }
-            self._molds[key] = mold
+        # creates new molds from a row per mold or a value shared by all of them
+        size = len(pos)
+        keys = [None]*size if key is None else list(key) if isinstance(key, (list, np.ndarray)) else [key]
+        colours = [colour]*size if is_color_like(colour) else list(colour)
+        if not len(keys) == len(colours) == size:
+            raise UserWarning('new molds need as many keys and colours as positions.')
+        given = [key for key in keys if key is not None]
+        if len(set(given)) < len(given):
+            raise UserWarning('keys of the new molds are not unique.')
+        available = np.zeros(size, dtype=bool)
+        # the given keys are checked before any key is generated, so a used key leaves the index as it was
+        for row in sorted(range(size), key=lambda row: keys[row] is None):
+            keys[row], available[row] = self.check_key(keys[row])
+        luts = {}
+        lut = np.zeros(size, dtype=int)
+        for row, colour in enumerate(colours):
+            if id(colour) not in luts:
+                luts[id(colour)] = self._molds.lut_index(self._lut(colour))
+            lut[row] = luts[id(colour)]
+        columns = {
+            'pos' : pos,
+            'scale' : scale,
+            'overground' : overground,
+            'lut' : lut,
+            'opacity' : opacity,
+            'visible' : visible,
+        }
+        keys = [key for key, new in zip(keys, available) if new]
+        if len(set(keys)) < len(keys):
+            raise UserWarning('keys of the new molds are not unique.')
+        if not np.all(available):
+            for column, values in columns.items():
+                shape = (size, 3) if column == 'pos' else (size,)
+                columns[column] = np.broadcast_to(values, shape)[available]
+        self._molds.append(keys, **columns)
+        if self._emitters:
+            self._store_particles()
+        return self
+
+    def _store_particles(self):
+        # writes the live particles of every emitter as the rows without keys of the store
+        columns = [emitter.columns() for emitter in self._emitters.values()]
+        columns = {
+            column : np.concatenate([values[column] for values in columns])
+            for column in columns[0]
+        }
+        self._molds.extend(len(columns['pos']), **columns)
+
+    def _lut(self, colour):
+        # colour lookup table of a mold, shared between identical colours
+        key = to_rgba(colour)
+        if key not in self._luts:
+            cmap = self.cmap([self._sun_colour, colour, 'black'])
+            self._luts[key] = cmap(np.arange(cmap.N)).astype(self.render_dtype)
+        return self._luts[key]
+
+    @staticmethod
+    def _shade_lut(table, luts, values):
+        # gathers the colours of the values with the same buckets as a cmap, from the lut of each value
+        indices = np.clip(values*table.shape[1], 0, table.shape[1] - 1).astype(int)
+        return table[luts, indices]
 
     @staticmethod
     def _conv2(M):
@@ -96,108 +233,859 @@ class Mold(Brush):
 
     @staticmethod
     def _avg_mat(matrix):
-        matopa = matrix[:,:,-1:]
-        avgopa = Mold._conv2(matopa)
-        avgopa += avgopa == 0
-        matrix = Mold._conv2(matrix*matopa)/avgopa
-        matrix[:,:,-1:] = Mold._conv2(matopa)/4
+        # averages a premultiplied matrix and returns it with straight alpha
+        avgopa = Mold._conv2(matrix[:,:,-1:])
+        matrix = Mold._conv2(matrix)
+        matrix[:,:,:-1] /= avgopa + (avgopa == 0)
+        matrix[:,:,-1:] = avgopa/4
         return matrix
 
     @staticmethod
-    def _depth(mold):
-        return mold['volume'].depth
+    def _levels(slots):
+        # number of previous entries sharing the slot of each entry
+        order = np.argsort(slots, kind='stable')
+        first = np.ones(len(slots), dtype=bool)
+        first[1:] = slots[order[1:]] != slots[order[:-1]]
+        starts = np.flatnonzero(first)
+        levels = np.empty(len(slots), dtype=int)
+        levels[order] = np.arange(len(slots)) - np.repeat(starts, np.diff(np.append(starts, len(slots))))
+        return levels
+
+    @staticmethod
+    def _layers(slots):
+        # splits entries into layers where each slot appears at most once, keeping their order per slot
+        levels = Mold._levels(slots)
+        order = np.argsort(levels, kind='stable')
+        return np.split(order, np.cumsum(np.bincount(levels))[:-1])
+
+    @staticmethod
+    def _blend(values, slots, opacity):
+        # stacks opacities over the values of their slots, one after the other
+        transmit = (1 - opacity).astype(values.dtype)
+        for layer in Mold._layers(slots):
+            values[slots[layer]] = 1 - (1 - values[slots[layer]])*transmit[layer]
 
+    def _ragged(self, counts):
+        # enumerates the (item, offset) pairs of ragged counts by blocks within the budget
+        ends = np.cumsum(counts)
+        step = max(self._project_budget//128, 1)
+        for start in range(0, ends[-1] if len(ends) else 0, step):
+            stop = min(start + step, ends[-1])
+            block = np.clip(ends, start, stop) - np.clip(ends - counts, start, stop)
+            items = np.repeat(np.arange(len(counts)), block)
+            yield items, np.arange(start, stop) - ends[items] + counts[items]
+
+    def _stage(self, stage):
+        # counters of a stage in the frame stats
+        if stage not in self._stats['stages']:
+            self._stats['stages'][stage] = dict.fromkeys(['calls', 'time', 'pixels', 'bytes'], 0)
+        return self._stats['stages'][stage]
+
+    def _count(self, stage, **counters):
+        # adds to the counters of a stage when stats are enabled
+        if self._stats is not None:
+            record = self._stage(stage)
+            for key, value in counters.items():
+                record[key] = record.get(key, 0) + value
+
+    def _record(self, stage, method, /, *args, **kwargs):
+        # calls a method and records its time and allocations when stats are enabled
+        if self._stats is None:
+            return method(*args, **kwargs)
+        peaks = self._stats['peaks']
+        tracing = tracemalloc.is_tracing()
+        if tracing:
+            start_bytes, peak = tracemalloc.get_traced_memory()
+            if peaks:
+                peaks[-1] = max(peaks[-1], peak)
+            peaks.append(0)
+            tracemalloc.reset_peak()
+        start = time.perf_counter()
+        result = method(*args, **kwargs)
+        record = self._stage(stage)
+        record['calls'] += 1
+        record['time'] += time.perf_counter() - start
+        if tracing:
+            peak = max(peaks.pop(), tracemalloc.get_traced_memory()[1])
+            if peaks:
+                peaks[-1] = max(peaks[-1], peak)
+            record['bytes'] += peak - start_bytes
+        return result
+
+    @_staged('project_molds')
     def _project_molds(self):
-        for mold in self._molds.values():
-            volume = mold['volume']
-            if not volume.projected:
-                volume.project(self._view)
+        rows = np.flatnonzero(~self._molds.projected)
+        projection = Volume.project_sphere_arrays(
+            self._molds.pos[rows],
+            self._molds.scale[rows],
+            self._molds.overground[rows],
+            self._view,
+            self._project_budget,
+        )
+        self._molds.update(rows, **projection)
+        if self._stats is not None:
+            pixels = np.bincount(projection['sid'], minlength=len(rows))
+            self._count('project_molds', pixels=int(np.sum(pixels)), culled=int(np.sum(pixels == 0)))
+
+    def _shade_pairs(self, loc=None):
+        # finds which molds can shade which, unless the molds and the sun did not change since the last search
+        # particles are left out, so they shade the ground but not the molds unless the shadow map is on
+        keyed = len(self._molds.names)
+        loc = (self._molds.loc if loc is None else loc)[:keyed]
+        rad = self._molds.scale[:keyed]/2
+        key = (self._view.sun_z.tobytes(), loc.tobytes(), rad.tobytes())
+        pairs = self._shade_cache.get(key)
+        if pairs is None:
+            pairs = self._find_pairs(loc, rad)
+            self._shade_cache.clear()
+            self._shade_cache[key] = pairs
+        self._pairs = pairs
+
+    def _share_pairs(self):
+        # fills the cache of shade pairs once, from the centres the tiles will project, before they read it
+        if self.shadows and not self.shadow_map:
+            rows = np.flatnonzero(~self._molds.projected)
+            loc = self._molds.loc.astype(self._view.dtype)
+            loc[rows] = Volume.sphere_locs(
+                self._molds.pos[rows],
+                (self._molds.scale[rows]/2).astype(self._view.dtype),
+                self._molds.overground[rows],
+                self._view,
+            )
+            self._shade_pairs(loc)
+
+    @_staged('shade_pairs')
+    def _find_pairs(self, loc, rad):
+        # casters and receivers of spheres overlapping across the sun, binned by their bounding boxes
+        self._count('shade_pairs', molds=len(rad))
+        sun = self._view.sun_coordinates(loc)
+        low = sun[:,:2] - rad[:,None]
+        low -= np.min(low, axis=0, initial=0)
+        size = (4*np.median(rad) if len(rad) else 0) or 1
+        while np.sum((2*rad//size + 2)**2) > 16*len(rad) + 1024:
+            size *= 2
+        cmin = (low//size).astype(int)
+        cmax = ((low + 2*rad[:,None])//size).astype(int)
+        height = np.max(cmax[:,1], initial=0) + 1
+        widths = cmax[:,1] - cmin[:,1] + 1
+        areas = (cmax[:,0] - cmin[:,0] + 1)*widths
+        molds = np.repeat(np.arange(len(rad)), areas)
+        offset = np.arange(len(molds)) - np.repeat(np.cumsum(areas) - areas, areas)
+        row, col = np.divmod(offset, widths[molds])
+        cells = (cmin[molds,0] + row)*height + cmin[molds,1] + col
+        order = np.argsort(cells, kind='stable')
+        cells, molds = cells[order], molds[order]
+        later = np.searchsorted(cells, cells, side='right') - np.arange(len(cells)) - 1
+        first, second = [np.zeros(0, dtype=int)], [np.zeros(0, dtype=int)]
+        for entry, offset in self._ragged(later):
+            caster, receiver = molds[entry], molds[entry + 1 + offset]
+            corner = np.maximum(cmin[caster], cmin[receiver])
+            shared = corner[:,0]*height + corner[:,1] == cells[entry]
+            caster, receiver = caster[shared], receiver[shared]
+            overlap = np.sum((sun[caster,:2] - sun[receiver,:2])**2, axis=-1)
+            overlap = overlap <= (rad[caster] + rad[receiver])**2
+            first.append(caster[overlap])
+            second.append(receiver[overlap])
+        first, second = np.concatenate(first), np.concatenate(second)
+        casters = np.concatenate([first, second])
+        receivers = np.concatenate([second, first])
+        upstream = sun[casters,-1] - sun[receivers,-1] < rad[receivers]
+        casters, receivers = casters[upstream], receivers[upstream]
+        order = np.lexsort((casters, receivers))
+        return casters[order], receivers[order]
+
+    def _shadow_key(self):
+        # everything the shadow map depends on
+        key = (self._view.sun_z.tobytes(), self._molds.loc.tobytes(), self._molds.scale.tobytes())
+        key += (self._molds.opacity.tobytes(), self._molds.visible.tobytes(), self.shadow_map, self._shadow_layers)
+        return key
+
+    def _shadow_map(self):
+        # rasterizes the molds seen from the sun into layered opacity maps
+        loc = self._molds.loc
+        rad = self._molds.scale/2
+        opacity = self._molds.opacity
+        visible = self._molds.visible
+        key = self._shadow_key()
+        if key in self._shadows:
+            return self._shadows[key]
+        sun = self._view.sun_coordinates(loc)
+        low = np.min(sun - rad[:,None], axis=0, initial=0)
+        high = np.max(sun + rad[:,None], axis=0, initial=0)
+        size = max(np.max(high[:2] - low[:2]), 1e-9)/self.shadow_map
+        shape = np.ceil((high[:2] - low[:2])/size).astype(int) + 1
+        tmin = np.floor((sun[:,:2] - rad[:,None] - low[:2])/size).astype(int)
+        tmax = np.ceil((sun[:,:2] + rad[:,None] - low[:2])/size).astype(int) + 1
+        tmin, tmax = np.clip(tmin, 0, shape), np.clip(tmax, 0, shape)
+        widths = tmax[:,1] - tmin[:,1]
+        areas = (tmax[:,0] - tmin[:,0])*widths
+        cid = np.repeat(np.arange(len(loc)), areas)
+        offset = np.arange(np.sum(areas)) - np.repeat(np.cumsum(areas) - areas, areas)
+        texel = np.stack(np.divmod(offset, widths[cid]), axis=-1) + tmin[cid]
+        dist2 = np.sum((low[:2] + (texel + 0.5)*size - sun[cid,:2])**2, axis=-1)
+        inside = dist2 <= rad[cid]**2
+        cid, texel, dist2 = cid[inside], texel[inside], dist2[inside]
+        texel = texel[:,0]*shape[1] + texel[:,1]
+        with np.errstate(divide='ignore'):
+            absorb = -np.log1p(-opacity)
+        ground = np.bincount(texel, weights=absorb[cid], minlength=np.prod(shape))
+        front = sun[cid,2] - (rad[cid]**2 - dist2)**0.5
+        layer = (front - low[2])/max(high[2] - low[2], 1e-9)*self._shadow_layers
+        layer = np.clip(layer.astype(int), 0, self._shadow_layers - 1)
+        casting = visible[cid]*(opacity[cid] > 0)
+        layers = np.bincount(
+            (layer*np.prod(shape) + texel)[casting],
+            weights=absorb[cid][casting],
+            minlength=self._shadow_layers*np.prod(shape),
+        )
+        layers = np.cumsum(layers.reshape((self._shadow_layers, -1)), axis=0)
+        shadow = {
+            'low' : low,
+            'high' : high,
+            'size' : size,
+            'shape' : shape,
+            'ground' : np.exp(-ground),
+            'layers' : np.exp(-layers),
+        }
+        self._shadows.clear()
+        self._shadows[key] = shadow
+        return shadow
+
+    def _shadow_texels(self, shadow, pos):
+        # sun coordinates and texels of positions in the shadow map
+        sun = self._view.sun_coordinates(pos)
+        texel = np.floor((sun[:,:2] - shadow['low'][:2])/shadow['size']).astype(int)
+        inside = np.all((texel >= 0)*(texel < shadow['shape']), axis=-1)
+        texel = np.clip(texel, 0, shadow['shape'] - 1)
+        return sun, texel, inside
+
+    def _shadow_overshade(self, rows, surface):
+        # opacity of the molds upstream of the pixels of molds, read from the shadow map
+        shadow = self._shadow_map()
+        sun, texel, inside = self._shadow_texels(shadow, surface)
+        centre = self._view.sun_coordinates(self._molds.loc[rows])
+        rad2 = (self._molds.scale[rows]/2)**2
+        dist2 = shadow['low'][:2] + (texel + 0.5)*shadow['size'] - centre[:,:2]
+        dist2 = np.sum(dist2**2, axis=-1)
+        front = centre[:,2] - np.maximum(rad2 - dist2, 0)**0.5
+        front = np.where(dist2 <= rad2, front, sun[:,2])
+        layer = (front - shadow['low'][2])/max(shadow['high'][2] - shadow['low'][2], 1e-9)
+        layer = np.floor(layer*self._shadow_layers).astype(int) - 1
+        transmit = shadow['layers'][
+            np.clip(layer, 0, self._shadow_layers - 1),
+            texel[:,0]*shadow['shape'][1] + texel[:,1],
+        ]
+        return (1 - transmit)*inside*(layer >= 0)
+
+    def _shadow_ground(self, pos):
+        # opacity of the molds above ground positions, read from the shadow map
+        shadow = self._shadow_map()
+        _, texel, inside = self._shadow_texels(shadow, pos)
+        transmit = shadow['ground'][texel[:,0]*shadow['shape'][1] + texel[:,1]]
+        return (1 - transmit)*inside
+
+    def _intersect(self, rows, pos):
+        # whether the rays from positions towards the sun cross the spheres of some molds
+        rel = self._molds.loc[rows] - pos
+        hyp2 = np.sum(rel**2, axis=-1)
+        adj = np.sum(rel*self._view.direction, axis=-1)
+        rad2 = ((self._molds.scale[rows]/2)**2).astype(hyp2.dtype)
+        return (hyp2 - adj**2 <= rad2)*(adj < 0)
 
     def _plot_molds(self):
-        self._matrix = np.zeros_like(self._matrix)
-        if self._view.pos[0,-1] < 0:
+        self._matrix[slice(None) if self._view.mask is None else self._view.mask] = 0
+        self._pairs = None
+        if self.shadows and not self.shadow_map:
+            self._shade_pairs()
+        elif not self.shadows:
+            self._pairs = (np.zeros(0, dtype=int), np.zeros(0, dtype=int))
+        if self.shadows and self._view.pos[0,-1] < 0:
             self._plot_shades()
-        for mold in sorted(self._molds.values(), key=self._depth):
-            self._plot_mold(**mold)
-        if self._view.pos[0,-1] >= 0:
+        rank = np.empty(self._molds.size, dtype=int)
+        rank[np.argsort(self._molds.depth, kind='stable')] = np.arange(self._molds.size)
+        sid = self._molds.pixels['sid']
+        pixels = np.argsort(rank[sid], kind='stable')
+        if self.zbuffer:
+            self._plot_zbuffer(pixels)
+        else:
+            drawn = self._molds.visible*(self._molds.opacity != 0)
+            self._plot_pixels(pixels[drawn[sid[pixels]]])
+        if self.shadows and self._view.pos[0,-1] >= 0:
             self._plot_shades()
 
-    def _overshade(self, key):
-        volume = self._molds[key]['volume']
-        overshade = np.zeros(len(volume.indices))
-        for mold in self._molds.values():
-            if mold['key'] == key or not mold['visible'] or not mold['opacity']:
-                continue
-            shaded = mold['volume'].intersect(
-                volume.surface,
-                self._view.direction,
-            )
-            overshade[shaded] = 1 - (1 - overshade[shaded])*(1 - mold['opacity'])
+    def _plot_zbuffer(self, pixels):
+        # plots opaque molds only where they are nearest to the view
+        sid = self._molds.pixels['sid'][pixels]
+        indices = self._molds.pixels['indices'][pixels]
+        distance = self._molds.pixels['distance'][pixels]
+        coverage = self._molds.pixels['coverage'][pixels]
+        visible = self._molds.visible[sid]
+        opacity = self._molds.opacity[sid]
+        zbuffer = np.full(len(self._matrix), np.inf, dtype=self._matrix.dtype)
+        writers = np.flatnonzero(visible*(opacity == 1)*(coverage == 1))
+        writers = writers[np.lexsort((writers, distance[writers], indices[writers]))]
+        first = np.ones(len(writers), dtype=bool)
+        first[1:] = indices[writers[1:]] != indices[writers[:-1]]
+        owners = writers[first]
+        owners = owners[distance[owners] < np.inf]
+        zbuffer[indices[owners]] = distance[owners]
+        select = visible*(opacity != 0)*(distance < zbuffer[indices])
+        select *= (opacity != 1) + self.antialias*(coverage < 1)
+        self._plot_pixels(pixels[select])
+        self._plot_pixels(pixels[owners])
+
+    @_staged('overshade')
+    def _overshade(self, pixels):
+        # opacity of the molds between the sun and some pixels of the molds
+        sid = self._molds.pixels['sid'][pixels]
+        surface = self._molds.pixels['surface'][pixels]
+        self._count('overshade', pixels=len(surface))
+        if not self.shadows:
+            return np.zeros(len(surface), dtype=surface.dtype)
+        if self.shadow_map:
+            overshade = self._shadow_overshade(sid, surface).astype(surface.dtype)
+            return self._overshade_shift*overshade
+        overshade = np.zeros(len(surface), dtype=surface.dtype)
+        casters, receivers = self._pairs
+        active = self._molds.visible[casters]*(self._molds.opacity[casters] != 0)
+        casters, receivers = casters[active], receivers[active]
+        first = np.searchsorted(receivers, sid)
+        counts = np.searchsorted(receivers, sid, side='right') - first
+        for shaded, offset in self._ragged(counts):
+            caster = casters[first[shaded] + offset]
+            hit = self._intersect(caster, surface[shaded])
+            self._blend(overshade, shaded[hit], self._molds.opacity[caster[hit]])
         return self._overshade_shift*overshade
 
+    @_staged('add_to_matrix')
     def _add_to_matrix(self, indices, to_add):
-            matrix = self._matrix[indices].copy()
-            matopa = matrix[:,-1:]
-            to_add, add_opa = to_add[:,:-1], to_add[:,-1:]
-            matrix[:,:-1] = matrix[:,:-1]*matopa + to_add*add_opa*(1 - matopa)
-            divider = matopa + add_opa*(1 - matopa)
-            divider += divider == 0
-            matrix /= divider
-            matrix[:,-1:] = 1 - (1 - matopa)*(1 - add_opa)
-            self._matrix[indices] = matrix
-
-    def _plot_mold(
-            self: Self,
-            volume: Volume,
-            key: Any,
-            cmap: colormaps,
-            opacity: float,
-            visible: bool,
-        ) -> Self:
-        # updates a given mold
-        if visible and opacity:
-            volcol = volume.sun_ratio + self._overshade(key)
-            volcol *= (self._sun_darkness - self._sun_lightness)
-            volcol = cmap(self._sun_lightness + volcol)
-            volcol[:,-1] *= opacity
-            self._add_to_matrix(volume.indices, volcol)
+        # adds colours under the premultiplied matrix using scratch buffers
+        if indices.dtype == bool:
+            indices = np.flatnonzero(indices)
+        self._count('add_to_matrix', pixels=len(indices))
+        block = self._block[:len(indices)]
+        layer = self._layer[:len(indices)]
+        weight = self._weight[:len(indices)]
+        np.take(self._matrix, indices, axis=0, out=block, mode='clip')
+        np.subtract(1, block[:,-1], out=weight)
+        np.multiply(weight, to_add[:,-1], out=weight)
+        np.multiply(to_add, weight[:,None], out=layer)
+        layer[:,-1] = weight
+        block += layer
+        self._matrix[indices] = block
+
+    def _plot_pixels(self, pixels):
+        # colours pixels of the molds and adds them under the matrix in their order
+        if not len(pixels):
+            return
+        sid = self._molds.pixels['sid'][pixels]
+        normal = self._molds.pixels['normal'][pixels]
+        volcol = Volume.sun_ratio(normal, self._view.direction) + self._overshade(pixels)
+        volcol *= (self._sun_darkness - self._sun_lightness)
+        volcol = self._shade_lut(self._molds.table(), self._molds.lut[sid], self._sun_lightness + volcol)
+        volcol[:,-1] *= self._molds.opacity[sid].astype(volcol.dtype)
+        if self.antialias:
+            volcol[:,-1] *= self._molds.pixels['coverage'][pixels]
+        indices = self._molds.pixels['indices'][pixels]
+        for layer in self._layers(indices):
+            self._add_to_matrix(indices[layer], volcol[layer])
 
+    @_staged('plot_shades')
     def _plot_shades(self):
-        maybe_shade = (self._view.rays[:,-1]*self._view.pos[:,-1] < 0)*(self._matrix[:,-1] < 1)
-        shades = np.zeros(np.sum(maybe_shade))
-        shades_pos = self._view.rays[maybe_shade]
-        shades_pos = self._view.pos - shades_pos*self._view.pos[:,-1:]/shades_pos[:,-1:]
-        for mold in self._molds.values():
-            shaded = mold['volume'].intersect(
-                shades_pos,
-                self._view.direction,
-            )
-            shades[shaded] = 1 - (1 - shades[shaded])*(1 - mold['opacity'])
+        maybe_shade = np.repeat(self._view.ground_rows(), self._view.shape[1])
+        maybe_shade *= self._matrix[:,-1] < 1
+        if self._view.mask is not None:
+            maybe_shade *= self._view.mask
+        shades = np.zeros(np.sum(maybe_shade), dtype=self._matrix.dtype)
+        self._count('plot_shades', pixels=len(shades))
+        shades_pos = self._view.ground_at(np.flatnonzero(maybe_shade))
+        if self.shadow_map:
+            shades[:] = self._shadow_ground(shades_pos)
+        else:
+            self._ellipse_shades(shades, maybe_shade, shades_pos)
         shades = np.stack([np.zeros_like(shades)]*3 + [shades], axis=-1)
         shades[:,:-1] = self._shade_colour
         shades[:,-1] *= self._shade_opacity
         self._add_to_matrix(maybe_shade, shades)
 
-    def show(self):
+    def _ellipse_shades(self, shades, maybe_shade, shades_pos):
+        # intersects the molds with the ground positions inside their shadow ellipses
+        slot = np.full(len(self._matrix), -1)
+        slot[maybe_shade] = np.arange(len(shades))
+        unit = self._view.direction/np.sum(self._view.direction**2)**0.5
+        loc = self._molds.loc
+        rows = np.tile([0, self._view.shape[0]], (len(loc), 1))
+        cols = np.tile([0, self._view.shape[1]], (len(loc), 1))
+        if unit[0,-1] < 0:
+            centre = loc - unit*loc[:,-1:]/unit[:,-1:]
+            rows, cols = self._view.bounds_all(centre, self._molds.scale/2/abs(unit[0,-1]))
+        widths = cols[:,1] - cols[:,0]
+        corners = rows[:,0]*self._view.shape[1] + cols[:,0]
+        for shading, offset in self._ragged((rows[:,1] - rows[:,0])*widths):
+            row, col = np.divmod(offset, widths[shading])
+            candidates = slot[corners[shading] + row*self._view.shape[1] + col]
+            shading, candidates = shading[candidates >= 0], candidates[candidates >= 0]
+            hit = self._intersect(shading, shades_pos[candidates])
+            self._blend(shades, candidates[hit], self._molds.opacity[shading[hit]])
+
+    def _tile(self, rows, cols):
+        # copies the mold state onto a window of the frame
+        tile = copy.copy(self)
+        tile._view = self._view.window(rows, cols)
+        tile._molds = self._molds.window()
+        size = (rows[1] - rows[0])*(cols[1] - cols[0])
+        if cols[1] - cols[0] == self._matrix_shape[1]:
+            start = rows[0]*self._matrix_shape[1]
+            tile._matrix = self._matrix[start:start + size]
+        else:
+            start = 0
+            tile._matrix = np.zeros((size, 4), dtype=self._matrix.dtype)
+        if hasattr(self, '_block'):
+            if start + size > len(self._block):
+                start = 0
+            for attr in ['_block', '_layer', '_weight']:
+                setattr(tile, attr, getattr(self, attr)[start:start + size])
+        else:
+            tile._block = np.zeros_like(tile._matrix)
+            tile._layer = np.zeros_like(tile._matrix)
+            tile._weight = np.zeros(size, dtype=tile._matrix.dtype)
+        return tile
+
+    def _render_tile(self, rows, cols=None):
+        if cols is None:
+            cols = (0, self._matrix_shape[1])
+        tile = self._tile(rows, cols)
+        tile._project_molds()
+        tile._plot_molds()
+        if not np.may_share_memory(tile._matrix, self._matrix):
+            matrix = self._matrix.reshape(self._matrix_shape)
+            matrix[rows[0]:rows[1],cols[0]:cols[1]] = tile._matrix.reshape(tile._view.shape)
+
+    def _tile_rows(self, workers):
+        n_tiles = min(workers*self._tiles_per_thread, self._matrix_shape[0])
+        rows = np.linspace(0, self._matrix_shape[0], n_tiles + 1).astype(int)
+        return [(int(start), int(stop)) for start, stop in zip(rows[:-1], rows[1:])]
+
+    def _chunk_rows(self):
+        # number of rows rendered at once to stay within the memory budget
+        row_bytes = self._matrix_shape[1]*self._pixel_floats*np.dtype(self.render_dtype).itemsize
+        return int(min(max(self.memory_budget//row_bytes, 1), self._matrix_shape[0]))
+
+    def _render_chunks(self):
+        # renders the frame one chunk of rows after the other
+        rows = self._chunk_rows()
+        self._share_pairs()
+        for start in range(0, self._matrix_shape[0], rows):
+            self._render_tile((start, min(start + rows, self._matrix_shape[0])))
+
+    def _avg_chunks(self):
+        # averages the matrix one chunk of rows after the other
+        matrix = self._matrix.reshape(self._matrix_shape)
+        averaged = np.zeros((matrix.shape[0] - 1, matrix.shape[1] - 1, 4), dtype=matrix.dtype)
+        rows = self._chunk_rows()
+        for start in range(0, len(averaged), rows):
+            averaged[start:start + rows] = self._avg_mat(matrix[start:start + rows + 1])
+        return averaged
+
+    def _render_tiles(self):
+        self._share_pairs()
+        with ThreadPoolExecutor(max_workers=self.threads) as executor:
+            list(executor.map(self._render_tile, self._tile_rows(self.threads)))
+
+    @staticmethod
+    def _close_shared(shared):
+        for segment in shared.values():
+            segment.close()
+            segment.unlink()
+        shared.clear()
+
+    def _shared_array(self, key, array):
+        # copies an array into a persistent shared memory segment
+        segment = self._shared.get(key)
+        if segment is None or segment.size < max(array.nbytes, 1):
+            if segment is not None:
+                segment.close()
+                segment.unlink()
+            segment = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+            self._shared[key] = segment
+        shared = np.ndarray(array.shape, dtype=array.dtype, buffer=segment.buf)
+        if not np.may_share_memory(shared, array):
+            shared[...] = array
+        return shared
+
+    def _shared_state(self):
+        # compact description of the molds sent to the workers once per frame
+        state = {
+            'view' : self._view,
+            'attrs' : {attr : getattr(self, attr) for attr in self._shared_attrs},
+            'molds' : self._molds.window(),
+            'shade_cache' : self._shade_cache,
+        }
+        return np.frombuffer(pickle.dumps(state), dtype=np.uint8)
+
+    @staticmethod
+    def _attach_shared(shared):
+        # rebuilds the frame in a worker from the shared memory segments
+        worker = Mold._worker
+        worker.pop('mold', None)
+        for key in ['matrix', 'state']:
+            name, shape, dtype = shared[key]
+            worker.pop(key + '_array', None)
+            if key in worker and worker[key].name != name:
+                worker.pop(key).close()
+            if key not in worker:
+                worker[key] = shared_memory.SharedMemory(name=name)
+            worker[key + '_array'] = np.ndarray(shape, dtype=dtype, buffer=worker[key].buf)
+        state = pickle.loads(worker['state_array'].tobytes())
+        mold = Mold.__new__(Mold)
+        mold.__dict__.update(state['attrs'])
+        mold._shadows = {}
+        mold._shade_cache = state['shade_cache']
+        mold._matrix_shape = state['view'].shape
+        mold._matrix = worker['matrix_array']
+        mold._view = state['view']
+        mold._molds = state['molds']
+        worker['frame'] = shared['frame']
+        worker['mold'] = mold
+
+    @staticmethod
+    def _render_shared(shared, rows):
+        # renders a band of rows in a worker process and returns the stages it recorded
+        if Mold._worker.get('frame') != shared['frame']:
+            Mold._attach_shared(shared)
+        mold = Mold._worker['mold']
+        mold._stats = {'stages' : {}, 'peaks' : []} if shared['stats'] else None
+        mold._render_tile(rows)
+        return {} if mold._stats is None else mold._stats['stages']
+
+    def _render_processes(self):
+        if self._executor is None or self._executor._max_workers != self.processes:
+            self._executor = ProcessPoolExecutor(max_workers=self.processes)
+        self._frame += 1
+        shared = {'frame' : (id(self), self._frame), 'stats' : self._stats is not None}
+        self._matrix = self._shared_array('matrix', self._matrix)
+        self._share_pairs()
+        state = self._shared_array('state', self._shared_state())
+        for key, array in [('matrix', self._matrix), ('state', state)]:
+            shared[key] = (self._shared[key].name, array.shape, array.dtype.str)
+        rows = self._tile_rows(self.processes)
+        for stages in self._executor.map(self._render_shared, itertools.repeat(shared), rows):
+            for stage, counters in stages.items():
+                self._count(stage, **counters)
+
+    def _footprint_rects(self):
+        # screen bounds of the molds and of their shades on the ground
+        loc = self._molds.loc
+        rad = self._molds.scale/2
+        rects = np.zeros((len(loc), 2, 2, 2), dtype=int)
+        rects[:,0] = np.stack(self._view.bounds_all(loc, rad + self._view.edge(loc)/2), axis=1)
+        sun = self._view.sun_z[0]
+        if sun[-1] < 0:
+            ground = loc - sun*loc[:,-1:]/sun[-1]
+            rects[:,1] = np.stack(self._view.bounds_all(ground, rad/abs(sun[-1])), axis=1)
+        else:
+            rects[:,1] = ((0, self._matrix_shape[0]), (0, self._matrix_shape[1]))
+        return rects
+
+    def _store_footprints(self):
+        self._footprints = {
+            'size' : self._molds.size,
+            'keyed' : len(self._molds.names),
+            'rects' : self._footprint_rects(),
+            'shadow' : self._shadow_key() if self.shadow_map else None,
+        }
+        for column in ['loc', 'scale', 'opacity', 'visible', 'lut']:
+            self._footprints[column] = getattr(self._molds, column).copy()
+
+    def _paint_rects(self, rects):
+        # number of rectangles covering each pixel of the frame
+        paint = np.zeros((self._matrix_shape[0] + 1, self._matrix_shape[1] + 1), dtype=int)
+        rects = rects[(rects[:,0,0] < rects[:,0,1])*(rects[:,1,0] < rects[:,1,1])]
+        for row, col, sign in [(0, 0, 1), (0, 1, -1), (1, 0, -1), (1, 1, 1)]:
+            np.add.at(paint, (rects[:,0,row], rects[:,1,col]), sign)
+        return np.cumsum(np.cumsum(paint, axis=0), axis=1)[:-1,:-1]
+
+    def _render_dirty(self):
+        # re-renders only the regions touched by molds changed since last frame
+        if self._footprints is None:
+            return False
+        size, current = self._footprints['size'], self._molds.size
+        common = min(size, current)
+        changed = np.ones(max(size, current), dtype=bool)
+        changed[:common] = ~self._molds.projected[:common]
+        for column in ['opacity', 'visible', 'lut']:
+            changed[:common] += getattr(self._molds, column)[:common] != self._footprints[column][:common]
+        pairs = self._pairs
+        self._project_molds()
+        if self.shadow_map and self._shadow_key() != self._footprints['shadow']:
+            return False
+        footprints = self._footprint_rects()
+        rects = [self._footprints['rects'][changed[:size]], footprints[changed[:current]]]
+        limit = self._dirty_limit*len(self._matrix)
+        if np.sum(self._paint_rects(np.concatenate([rect.reshape((-1, 2, 2)) for rect in rects])) > 0) > limit:
+            return False
+        if not self.shadows or self.shadow_map:
+            # the shadow map did not change, so the changed molds shade nothing new
+            pairs = self._pairs = (np.zeros(0, dtype=int), np.zeros(0, dtype=int))
+        else:
+            if pairs is None:
+                keyed = self._footprints['keyed']
+                pairs = self._find_pairs(self._footprints['loc'][:keyed], self._footprints['scale'][:keyed]/2)
+            self._shade_pairs()
+        for casters, receivers in [pairs, self._pairs]:
+            receivers = np.unique(receivers[changed[casters]])
+            rects.append(self._footprints['rects'][receivers[receivers < size],:1])
+            rects.append(footprints[receivers[receivers < current],:1])
+        # the pixels are rendered in a single masked pass, whatever the number of rectangles
+        mask = self._paint_rects(np.concatenate([rect.reshape((-1, 2, 2)) for rect in rects])) > 0
+        if np.sum(mask) > limit:
+            return False
+        self._render_mask(mask)
+        return True
+
+    def _render_mask(self, mask):
+        # renders the pixels of a boolean mask of the frame
+        tile = self._tile((0, self._matrix_shape[0]), (0, self._matrix_shape[1]))
+        tile._view.mask = mask.reshape(-1)
+        tile._project_molds()
+        tile._plot_molds()
+
+    def _small_footprints(self, step):
+        # summed area table of the footprints too small to be caught by a grid of a given step
+        rects = self._footprint_rects().reshape((-1, 2, 2))
+        small = np.any(rects[:,:,1] - rects[:,:,0] <= 2*step, axis=-1)
+        small = self._paint_rects(rects[small]) > 0
+        return np.pad(np.cumsum(np.cumsum(small, axis=0), axis=1), ((1, 0), (1, 0)))
+
+    def _render_progressive(self, refine=True):
+        # renders a coarse grid and refines only the cells whose corners disagree
+        height, width = self._matrix_shape[:2]
+        matrix = self._matrix.reshape(self._matrix_shape)
+        step = 2**self.progressive
+        mask = np.zeros((height, width), dtype=bool)
+        mask[::step,::step] = True
+        self._view.mask = mask.reshape(-1)
         self._project_molds()
         self._plot_molds()
-        self.apply(
-            method='set_data',
-            key='_mold_matrix',
-            A=self._avg_mat(self._matrix.reshape(self._matrix_shape)),
+        self._view.mask = None
+        table = self._small_footprints(step)
+        self._molds.projected[:] = False
+        rows, cols = np.meshgrid(
+            np.arange(0, height - 1, step),
+            np.arange(0, width - 1, step),
+            indexing='ij',
         )
+        rows, cols = rows.reshape(-1), cols.reshape(-1)
+        while step > 1:
+            ends = (np.minimum(rows + step, height - 1), np.minimum(cols + step, width - 1))
+            corners = np.stack([
+                matrix[rows,cols],
+                matrix[rows,ends[1]],
+                matrix[ends[0],cols],
+                matrix[ends[0],ends[1]],
+            ], axis=1)
+            spread = np.max(np.max(corners, axis=1) - np.min(corners, axis=1), axis=-1)
+            small = table[ends[0] + 1,ends[1] + 1] - table[rows,ends[1] + 1]
+            small += table[rows,cols] - table[ends[0] + 1,cols]
+            partial = (rows + step > height - 1) + (cols + step > width - 1)
+            busy = partial + refine*((small > 0) + (spread > self._progressive_tol))
+            quiet = ~busy*~partial
+            ratio = np.arange(step + 1)/step
+            weights = np.stack([
+                np.outer(1 - ratio, 1 - ratio),
+                np.outer(1 - ratio, ratio),
+                np.outer(ratio, 1 - ratio),
+                np.outer(ratio, ratio),
+            ]).astype(matrix.dtype)
+            offsets = np.arange(step + 1)
+            fill = np.einsum('kij,nkc->nijc', weights, corners[quiet])
+            matrix[
+                rows[quiet,None,None] + offsets[:,None],
+                cols[quiet,None,None] + offsets,
+            ] = fill
+            half = step//2
+            rows, cols = rows[busy], cols[busy]
+            rows = (rows[:,None] + np.array([0, half, 0, half])).reshape(-1)
+            cols = (cols[:,None] + np.array([0, 0, half, half])).reshape(-1)
+            inside = (rows < height - 1)*(cols < width - 1)
+            rows, cols = rows[inside], cols[inside]
+            mask[:] = False
+            for row, col in [(0, 0), (0, half), (half, 0), (half, half)]:
+                mask[np.minimum(rows + row, height - 1), np.minimum(cols + col, width - 1)] = True
+            mask[::step,::step] = False
+            if np.any(mask):
+                self._render_mask(mask)
+            step = half
+
+    def _render(self, refine=True):
+        # resolves the matrix of the frame and returns it averaged
+        self._shown += 1
+        if self.stats:
+            self._stats = {
+                'frame' : self._shown,
+                'molds' : self._molds.size,
+                'stages' : {},
+                'peaks' : [],
+                'start' : time.perf_counter(),
+            }
+        if self.memory_budget:
+            self._footprints = None
+            self._render_chunks()
+        elif self.progressive:
+            self._footprints = None
+            self._render_progressive(refine)
+        elif self.processes > 1:
+            self._footprints = None
+            self._render_processes()
+        elif self.threads > 1:
+            self._footprints = None
+            self._render_tiles()
+        else:
+            if not self._render_dirty():
+                self._project_molds()
+                self._plot_molds()
+            self._store_footprints()
+        if self.memory_budget:
+            matrix = self._record('avg_mat', self._avg_chunks)
+        else:
+            matrix = self._record('avg_mat', self._avg_mat, self._matrix.reshape(self._matrix_shape))
+        self._count('avg_mat', pixels=len(self._matrix))
+        return matrix
+
+    def _end_stats(self):
+        # closes the stats of the frame and hands them to the hook
+        if self._stats is not None:
+            self.frame_stats, self._stats = self._stats, None
+            self.frame_stats.pop('peaks')
+            self.frame_stats['time'] = time.perf_counter() - self.frame_stats.pop('start')
+            if self.stats_hook is not None:
+                self.stats_hook(self.frame_stats)
+
+    def _overlay_array(self, transparent=False, refresh=False):
+        # rasterizes the figure without the molds once: the artists drawn over them and the background under them
+        if refresh:
+            self._overlay.clear()
+        if transparent not in self._overlay:
+            image, patch = self._brushs['_mold_matrix'], self.ax.patch
+            visible, facecolor, axes = image.get_visible(), self.fig.get_facecolor(), patch.get_visible()
+            image.set_visible(False)
+            if transparent:
+                self.fig.set_facecolor((0, 0, 0, 0))
+            back = self._draw_rgba()
+            self.fig.set_facecolor((0, 0, 0, 0))
+            patch.set_visible(False)
+            overlay = self._draw_rgba()
+            image.set_visible(visible)
+            patch.set_visible(axes)
+            self.fig.set_facecolor(facecolor)
+            # what shows through the overlay: the background already attenuated by it
+            back -= overlay
+            np.maximum(back, 0, out=back)
+            self._overlay[transparent] = (overlay, 1 - overlay[:,:,-1:], back)
+        return self._overlay[transparent]
+
+    def _draw_rgba(self):
+        # draws the figure with Agg into premultiplied float RGBA
+        canvas = FigureCanvasAgg(self.fig)
+        canvas.draw()
+        rgba = np.asarray(canvas.buffer_rgba()).astype(np.float32)/255
+        rgba[:,:,:-1] *= rgba[:,:,-1:]
+        return rgba
+
+    def _compose(self, matrix, transparent=False, refresh=False):
+        # blends the averaged matrix with the background and the overlay into uint8 RGBA
+        transparent = bool(transparent)
+        overlay, under, back = self._overlay_array(transparent, refresh)
+        if matrix.shape[:2] != overlay.shape[:2]:
+            rows = np.arange(overlay.shape[0])*matrix.shape[0]//overlay.shape[0]
+            cols = np.arange(overlay.shape[1])*matrix.shape[1]//overlay.shape[1]
+            matrix = matrix[rows][:,cols]
+        frame = matrix.astype(np.float32)
+        alpha = frame[:,:,-1:].copy()
+        frame[:,:,-1] = 1
+        frame *= alpha
+        frame *= under
+        frame += overlay
+        frame += (1 - alpha)*back
+        if transparent:
+            alpha = frame[:,:,-1:].copy()
+            frame /= alpha + (alpha == 0)
+        frame *= 255
+        frame += 0.5
+        frame = frame.astype(np.uint8)
+        frame[:,:,-1] = 255 if not transparent else (255*alpha[:,:,0] + 0.5).astype(np.uint8)
+        return frame
+
+    def show(self, refine=True):
+        matrix = self._render(refine)
+        self._record('set_data', self.apply, method='set_data', key='_mold_matrix', A=matrix)
+        self._count('set_data', pixels=matrix.shape[0]*matrix.shape[1])
+        self._end_stats()
+
+    def render_array(self, transparent=False, refresh=False, refine=True):
+        matrix = self._render(refine)
+        frame = self._record('compose', self._compose, matrix, transparent, refresh)
+        self._count('compose', pixels=frame.shape[0]*frame.shape[1])
+        self._end_stats()
+        return frame
+
+    def render_views(self, views, transparent=False, refine=True):
+        # renders frames of the molds from several views given by their params, sharing the work they have in common
+        view, footprints, pairs = self._view, self._footprints, self._pairs
+        matrix = None if footprints is None else self._matrix.copy()
+        pixels = self._molds.pixels
+        columns = {column : getattr(self._molds, column).copy() for column in ['projected', 'loc', 'depth']}
+        frames = []
+        try:
+            for params in views:
+                self._view = copy.copy(view).set_view(**params)
+                self._molds.projected[:] = False
+                self._footprints = None
+                frames.append(self.render_array(transparent=transparent, refine=refine))
+        finally:
+            self._view, self._footprints, self._pairs = view, footprints, pairs
+            if matrix is not None:
+                self._matrix[:] = matrix
+            self._molds.pixels = pixels
+            for column, values in columns.items():
+                getattr(self._molds, column)[:] = values
+        return frames
+
+    def new_sphere(self, pos=0, scale=1, overground=True, key=None, colour=Brush.hsl(), opacity=1, visible=True):
+        self._new_molds(Volume.to3d(pos), scale, overground, [key], colour, opacity, visible)
+
+    def new_spheres(self, pos=0, scale=1, overground=True, key=None, colour=Brush.hsl(), opacity=1, visible=True):
+        # creates spheres from arrays of positions and scales, with a value per sphere or shared by all
+        pos = np.array(pos, dtype=float)
+        if pos.ndim < 2:
+            pos = Volume.to3d(pos)
+        elif pos.shape[-1] > 3:
+            raise UserWarning('positions of new spheres have at most 3 coordinates.')
+        pos = pos.reshape((-1, pos.shape[-1]))
+        self._new_molds(np.pad(pos, ((0, 0), (0, 3 - pos.shape[1]))), scale, overground, key, colour, opacity, visible)
+
+    def new_emitter(self, key=None, colour=Brush.hsl(), **kwargs):
+        # creates a particle emitter, its particles being rendered as spheres
+        # particles shade the ground, but shade the molds and each other only with the shadow map
+        key, available = self._key_checker('emitter', key)
+        if available:
+            self._emitters[key] = Particles(lut=self._molds.lut_index(self._lut(colour)), **kwargs)
 
-    def new_sphere(self, pos=0, scale=1, axis=0, rotation=0, overground=True, *args, **kwargs):
-        volume = Volume.Sphere(pos, scale, axis, rotation, overground)
-        self._new_mold(volume, *args, **kwargs)
+    def advance(self, dt=1/30):
+        # moves the particles of every emitter by a time step
+        for emitter in self._emitters.values():
+            emitter.advance(dt)
+        if self._emitters:
+            self._store_particles()
 
     def set_view(self, *args, **kwargs):
         self._view.set_view(*args, **kwargs)
         for param in self._view.params():
             setattr(self, 'view_' + param, getattr(self._view, param))
-        for mold in self._molds.values():
-            mold['volume'].projected = False
+        self._molds.projected[:] = False
+        self._footprints = None
 
     def set_sun(self, *args, **kwargs):
         self._view.set_sun(*args, **kwargs)
+        self._footprints = None
 
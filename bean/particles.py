@@ -0,0 +1,105 @@
+import numpy as np
+import numpy.random as npr
+from typing_extensions import Self
+
+
+class Particles(object):
+
+    '''
+    fundamental variables and function
+    '''
+
+    pos = (0, 0, 0)
+    radius = 0
+    rate = 100
+    lifetime = 1
+    velocity = (0, 0, 1)
+    spread = 0.2
+    gravity = (0, 0, -1)
+    fade = True
+    scale = 0.05
+    opacity = 1
+    overground = False
+    lut = 0
+    seed = None
+
+    def __init__(
+            self: Self,
+            **kwargs,
+        ) -> None:
+        # initiate an emitter without any particle
+        for key, value in kwargs.items():
+            if value is not None:
+                setattr(self, key, value)
+        for attr in ['pos', 'velocity', 'gravity']:
+            setattr(self, attr, np.array(getattr(self, attr), dtype=float).reshape(3))
+        self._rng = npr.default_rng(self.seed)
+        self._debt = 0
+        self.particles = {
+            'pos' : np.zeros((0, 3)),
+            'velocity' : np.zeros((0, 3)),
+            'age' : np.zeros(0),
+        }
+
+    def __len__(self):
+        return len(self.particles['age'])
+
+    '''
+    hidden methods
+    '''
+
+    def _emit(
+            self: Self,
+            dt: float,
+        ) -> dict:
+        # new particles of a step, spread along the step by their age
+        self._debt += self.rate*dt
+        size = int(self._debt)
+        self._debt -= size
+        age = self._rng.uniform(0, dt, size)
+        pos = self._rng.normal(size=(size, 3))
+        pos *= self.radius*self._rng.uniform(size=(size, 1))**(1/3)/np.sum(pos**2, axis=-1, keepdims=True)**0.5
+        pos += self.pos
+        velocity = self.velocity + self.spread*self._rng.normal(size=(size, 3))
+        pos += velocity*age[:,None] + self.gravity*age[:,None]**2/2
+        velocity += self.gravity*age[:,None]
+        return {
+            'pos' : pos,
+            'velocity' : velocity,
+            'age' : age,
+        }
+
+    '''
+    main methods
+    '''
+
+    def advance(
+            self: Self,
+            dt: float,
+        ) -> Self:
+        # moves every particle by a step, removes the dead ones and emits new ones
+        particles = self.particles
+        particles['age'] += dt
+        particles['pos'] += particles['velocity']*dt + self.gravity*dt**2/2
+        particles['velocity'] += self.gravity*dt
+        new = self._emit(dt)
+        alive = np.append(particles['age'], new['age']) < self.lifetime
+        for key, values in particles.items():
+            particles[key] = np.concatenate([values, new[key]])[alive]
+        return self
+
+    def columns(
+            self: Self,
+        ) -> dict:
+        # store columns of the live particles
+        opacity = np.full(len(self), self.opacity, dtype=float)
+        if self.fade:
+            opacity *= np.clip(1 - self.particles['age']/self.lifetime, 0, 1)
+        return {
+            'pos' : self.particles['pos'],
+            'scale' : np.full(len(self), self.scale, dtype=float),
+            'overground' : np.full(len(self), self.overground, dtype=bool),
+            'lut' : np.full(len(self), self.lut, dtype=int),
+            'opacity' : opacity,
+            'visible' : np.ones(len(self), dtype=bool),
+        }
@@ -0,0 +1,280 @@
+import copy
+import numpy as np
+from collections.abc import Mapping
+from typing_extensions import Self
+
+from .volume import Volume
+
+
+class Column(object):
+
+    def __set_name__(self, owner, name):
+        self.name = '_' + name
+
+    def __get__(self, store, owner=None):
+        # the rows of a column, as a view of its buffer
+        return getattr(store, self.name)[:store.size]
+
+
+def _cell(column, keepdims=False):
+    # a property reading and writing the row of a volume in a column of its store
+    def getter(volume):
+        values = getattr(volume.store, '_' + column)
+        return values[volume.row:volume.row + 1] if keepdims else values[volume.row]
+    def setter(volume, value):
+        getattr(volume.store, '_' + column)[volume.row:volume.row + 1] = value
+    return property(getter, setter)
+
+
+def _pixels(name):
+    # a property reading the projected pixels of a volume in its store
+    def getter(volume):
+        return volume.store.pixels[name][slice(*volume.store.span(volume.row))]
+    return property(getter)
+
+
+class StoredVolume(Volume):
+
+    pos = _cell('pos', keepdims=True)
+    scale = _cell('scale')
+    overground = _cell('overground')
+    projected = _cell('projected')
+    loc = _cell('loc', keepdims=True)
+    depth = _cell('depth')
+    indices = _pixels('indices')
+    surface = _pixels('surface')
+    distance = _pixels('distance')
+    coverage = _pixels('coverage')
+    normal = _pixels('normal')
+
+    def __init__(self, store, row):
+        self.name = 'sphere'
+        self.store = store
+        self.row = row
+        self.axis = self.to3d(0)
+        self.rotation = 0
+
+    def project_sphere(self, view):
+        # projects the row into its store, next to the projections of the other rows
+        projection = self.project_sphere_arrays(self.pos, [self.scale], [self.overground], view)
+        self.store.update(np.array([self.row]), **projection)
+
+
+class StoredMold(Mapping):
+
+    _keys = ['key', 'volume', 'lut', 'opacity', 'visible']
+
+    def __init__(self, store, row):
+        self.store = store
+        self.row = row
+
+    def __getitem__(self, key):
+        if key == 'key':
+            return self.store.names[self.row]
+        elif key == 'volume':
+            return StoredVolume(self.store, self.row)
+        elif key == 'lut':
+            return self.store.luts[self.store.lut[self.row]]
+        elif key in self._keys:
+            return getattr(self.store, key)[self.row]
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        if key == 'lut':
+            value = self.store.lut_index(value)
+        elif key not in ['opacity', 'visible']:
+            raise KeyError(key)
+        getattr(self.store, key)[self.row] = value
+
+    def __iter__(self):
+        return iter(self._keys)
+
+    def __len__(self):
+        return len(self._keys)
+
+
+class Store(Mapping):
+
+    '''
+    fundamental variables and function
+    '''
+
+    pos = Column()
+    scale = Column()
+    overground = Column()
+    lut = Column()
+    opacity = Column()
+    visible = Column()
+    projected = Column()
+    loc = Column()
+    depth = Column()
+
+    _columns = {
+        'pos' : ((3,), float),
+        'scale' : ((), float),
+        'overground' : ((), bool),
+        'lut' : ((), int),
+        'opacity' : ((), float),
+        'visible' : ((), bool),
+        'projected' : ((), bool),
+        'loc' : ((3,), float),
+        'depth' : ((), float),
+    }
+    _pixels = ['sid', 'indices', 'surface', 'distance', 'coverage', 'normal']
+
+    def __init__(
+            self: Self,
+            capacity: int = 16,
+        ) -> None:
+        # empty columns of molds keyed by an index map
+        self.names = []
+        self.rows = {}
+        self.size = 0
+        self.luts = []
+        self._lut_ids = {}
+        self._table = None
+        for column, (shape, dtype) in self._columns.items():
+            setattr(self, '_' + column, np.zeros((capacity,) + shape, dtype=dtype))
+        self.clear_pixels()
+
+    def __getitem__(self, key):
+        return StoredMold(self, self.rows[key])
+
+    def __iter__(self):
+        return iter(self.names)
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, key):
+        return key in self.rows
+
+    '''
+    hidden methods
+    '''
+
+    def _resize(
+            self: Self,
+            size: int,
+            **columns,
+        ) -> Self:
+        # drops the rows without keys and fills the next rows up to a size, growing the buffers when needed
+        start = len(self.names)
+        if self.size > start:
+            kept = self.pixels['sid'] < start
+            self.pixels = {name : values[kept] for name, values in self.pixels.items()}
+        capacity = len(self._pos)
+        for column, (shape, dtype) in self._columns.items():
+            values = getattr(self, '_' + column)
+            if size > capacity:
+                values = np.concatenate([
+                    values[:start],
+                    np.zeros((max(size, 2*capacity) - start,) + shape, dtype=values.dtype),
+                ])
+                setattr(self, '_' + column, values)
+            values[start:size] = columns.get(column, 0)
+        self.size = size
+        return self
+
+    '''
+    main methods
+    '''
+
+    def append(
+            self: Self,
+            keys: list,
+            **columns,
+        ) -> Self:
+        # adds rows with keys after the previous ones
+        self._resize(len(self.names) + len(keys), **columns)
+        self.rows.update(zip(keys, range(len(self.names), self.size)))
+        self.names += keys
+        return self
+
+    def extend(
+            self: Self,
+            size: int,
+            **columns,
+        ) -> Self:
+        # replaces the rows without keys, which come after every row with a key
+        return self._resize(len(self.names) + size, **columns)
+
+    def lut_index(
+            self: Self,
+            lut: np.array,
+        ) -> int:
+        # index of a colour lookup table, shared between the molds using it
+        if id(lut) not in self._lut_ids:
+            self._lut_ids[id(lut)] = len(self.luts)
+            self.luts.append(lut)
+            self._table = None
+        return self._lut_ids[id(lut)]
+
+    def table(
+            self: Self,
+        ) -> np.array:
+        # colour lookup tables stacked along their first axis
+        if self._table is None:
+            self._table = np.stack(self.luts) if self.luts else np.zeros((0, 1, 4))
+        return self._table
+
+    def clear_pixels(
+            self: Self,
+        ) -> Self:
+        # forgets the projections of every row
+        self._projected[:] = False
+        self.pixels = {
+            'sid' : np.zeros(0, dtype=int),
+            'indices' : np.zeros(0, dtype=int),
+            'surface' : np.zeros((0, 3)),
+            'distance' : np.zeros(0),
+            'coverage' : np.zeros(0),
+            'normal' : np.zeros((0, 3)),
+        }
+        return self
+
+    def update(
+            self: Self,
+            rows: np.array,
+            loc: np.array,
+            depth: np.array,
+            sid: np.array,
+            **pixels,
+        ) -> Self:
+        # replaces the projection of some rows, keeping the pixels sorted by row
+        for column, values in [('loc', loc), ('depth', depth)]:
+            if getattr(self, '_' + column).dtype != values.dtype:
+                setattr(self, '_' + column, getattr(self, '_' + column).astype(values.dtype))
+            getattr(self, '_' + column)[rows] = values
+        self._projected[rows] = True
+        pixels['sid'] = rows[sid]
+        if len(rows) < self.size:
+            replaced = np.zeros(self.size, dtype=bool)
+            replaced[rows] = True
+            kept = ~replaced[self.pixels['sid']]
+            order = np.argsort(
+                np.concatenate([self.pixels['sid'][kept], pixels['sid']]),
+                kind='stable',
+            )
+            for name in self._pixels:
+                pixels[name] = np.concatenate([self.pixels[name][kept], pixels[name]])[order]
+        self.pixels = pixels
+        return self
+
+    def span(
+            self: Self,
+            row: int,
+        ) -> tuple:
+        # first and last pixels of a row
+        return tuple(np.searchsorted(self.pixels['sid'], [row, row + 1]))
+
+    def window(
+            self: Self,
+        ) -> Self:
+        # the same rows with a projection of their own, for a tile of the frame
+        store = copy.copy(self)
+        for column in self._columns:
+            setattr(store, '_' + column, getattr(self, '_' + column)[:self.size])
+        for column in ['projected', 'loc', 'depth']:
+            setattr(store, '_' + column, getattr(self, '_' + column)[:self.size].copy())
+        return store.clear_pixels()
@@ -1,9 +1,12 @@
+import copy
 import numpy as np
 from typing_extensions import Any, Self
 
 
 class View(object):
 
+    cache_size = 8
+
     @staticmethod
     def params():
         return [
@@ -14,10 +17,17 @@ class View(object):
             'rotation',
             'screen',
             'scale',
+            'ortho',
         ]
 
-    def __init__(self, shape=(2, 2), direction=np.array([0, 0, -1]), **kwargs):
+    def __init__(self, shape=(2, 2), direction=np.array([0, 0, -1]), dtype=float, antialias=False, **kwargs):
         self.shape = shape
+        self.frame = shape
+        self.origin = (0, 0)
+        self.dtype = np.dtype(dtype)
+        self.antialias = antialias
+        self.mask = None
+        self.grids = {}
         self.set_sun(direction)
         for param in self.params():
             if param not in kwargs:
@@ -43,6 +53,8 @@ class View(object):
                 np.cos(angle),
                 np.sin(angle),
             )
+        self.look_dir = tuple(map(float, look_dir))
+        self.width = (self.ortho or 0)/self.scale
         self.x = np.array([[
             np.cos(rotation),
             -np.sin(rotation),
@@ -58,27 +70,192 @@ class View(object):
             look_dir[0]*np.cos(rotation),
             look_dir[1],
         ]])
+        for attr in ['pos', 'x', 'y', 'z']:
+            setattr(self, attr, getattr(self, attr).astype(self.dtype))
         return self
 
+    def __rays__(self, rows, cols):
+        # normalized rays of pixels given by their rows and columns in the frame
+        if self.width:
+            return np.repeat(self.z, len(rows), axis=0)
+        x = (cols/(self.frame[1] - 1) - 0.5).astype(self.dtype)
+        y = (self.frame[0] - 1 - rows)/(self.frame[1] - 1) - 0.5*(self.frame[0] - 1)/(self.frame[1] - 1)
+        y = y.astype(self.dtype)
+        rays = self.x*x + self.y*y + self.screen*self.z
+        rays /= np.sum(rays**2, axis=-1, keepdims=True)**0.5
+        return rays
+
     def __set_rays__(self):
-        y, x = np.divmod(
-            np.arange(self.shape[0]*self.shape[1]).reshape((-1, 1)),
-            self.shape[1],
-        )
-        x = x/(self.shape[1] - 1) - 0.5
-        y = y[::-1]/(self.shape[1] - 1) - 0.5*(self.shape[0] - 1)/(self.shape[1] - 1)
-        self.rays = self.x*x + self.y*y + self.screen*self.z
-        self.rays /= np.sum(self.rays**2, axis=-1, keepdims=True)**0.5
+        # grid of the view for its orientation, reused from a small cache when the view only moves
+        key = (self.shape, self.frame, self.origin, self.dtype.str, self.rotation, self.look_dir, self.screen, self.width)
+        grid = self.grids.pop(key, None)
+        if grid is None:
+            grid = self.__grid__()
+        self.grids[key] = grid
+        while len(self.grids) > self.cache_size:
+            self.grids.pop(next(iter(self.grids)))
+        self.__dict__.update(grid)
+
+    def __grid__(self):
+        # screen coordinates of the columns and rows of the view, the ray of a pixel being x*ray_x + y*ray_y + screen*z
+        # in perspective and z from pos + width*(x*ray_x + y*ray_y) when orthographic, and the terms of their ground hits
+        rows = np.array([0, 0, self.shape[0] - 1, self.shape[0] - 1]).reshape((-1, 1))
+        cols = np.array([0, self.shape[1] - 1, 0, self.shape[1] - 1]).reshape((-1, 1))
+        step = self.frame[1] - 1
+        grid = {
+            'corners' : self.__rays__(rows, cols),
+            'pixel' : self.width/step if self.width else 1/(step*self.screen),
+        }
+        cols = np.arange(self.origin[1], self.origin[1] + self.shape[1])
+        rows = np.arange(self.origin[0], self.origin[0] + self.shape[0])
+        grid['ray_x'] = (cols/step - 0.5).astype(self.dtype)
+        grid['ray_y'] = ((self.frame[0] - 1 - rows)/step - 0.5*(self.frame[0] - 1)/step).astype(self.dtype)
+        if self.width:
+            grid['heights'] = self.width*self.y[0,-1]*grid['ray_y']
+            grid['ground_scale'] = np.zeros_like(grid['ray_y'])
+            slope = self.z[0,-1] or np.inf
+            grid['ground_y'] = self.width*(self.y - self.z*self.y[0,-1]/slope)*grid['ray_y'][:,None]
+            return grid
+        grid['heights'] = self.y[0,-1]*grid['ray_y'] + self.screen*self.z[0,-1]
+        grid['ground_scale'] = 1/np.where(grid['heights'] == 0, np.inf, grid['heights'])
+        grid['ground_y'] = (self.y*grid['ray_y'][:,None] + self.screen*self.z)*grid['ground_scale'][:,None]
+        return grid
+
+    def __bounds_ortho__(self, pos, rad):
+        # screen bounds of spheres given their position relative to an orthographic view
+        screen = []
+        for axis in [self.x, self.y]:
+            coord = np.sum(pos*axis, axis=-1)
+            screen.append((coord - rad)/self.width)
+            screen.append((coord + rad)/self.width)
+        return screen, np.ones(len(pos), dtype=bool)
+
+    def __bounds__(self, pos, rad):
+        # pixel bounds of spheres given their position relative to the view
+        if self.width:
+            screen, front = self.__bounds_ortho__(pos, rad)
+        else:
+            depth = np.sum(pos*self.z, axis=-1)
+            front = depth > rad
+            denom = np.where(front, depth**2 - rad**2, 1)
+            screen = []
+            for axis in [self.x, self.y]:
+                coord = np.sum(pos*axis, axis=-1)
+                spread = rad*np.maximum(coord**2 + depth**2 - rad**2, 0)**0.5
+                screen.append(self.screen*(coord*depth - spread)/denom)
+                screen.append(self.screen*(coord*depth + spread)/denom)
+        xmin, xmax, ymin, ymax = screen
+        step = self.frame[1] - 1
+        rows = np.stack([
+            np.floor(0.5*(self.frame[0] - 1) - ymax*step) - self.origin[0],
+            np.ceil(0.5*(self.frame[0] - 1) - ymin*step) + 1 - self.origin[0],
+        ], axis=-1)
+        cols = np.stack([
+            np.floor((xmin + 0.5)*step) - self.origin[1],
+            np.ceil((xmax + 0.5)*step) + 1 - self.origin[1],
+        ], axis=-1)
+        rows[~front] = (0, self.shape[0])
+        cols[~front] = (0, self.shape[1])
+        rows = np.clip(rows, 0, self.shape[0]).astype(int)
+        cols = np.clip(cols, 0, self.shape[1]).astype(int)
+        return rows, cols
 
     def __update_param__(self, key, value):
         assert key in self.params()
         setattr(self, key, value)
         return self
 
+    def ahead_all(self, locs):
+        adj = np.sum((locs.reshape((-1, 1, 3)) - self.pos)*self.corners, axis=-1)
+        return np.all(adj >= (0 if self.width else self.screen), axis=-1)
+
+    def edge(self, loc):
+        if self.width:
+            return self.antialias*self.pixel*np.ones(len(loc.reshape((-1, 3))), dtype=self.dtype)
+        return self.antialias*self.pixel*np.sum((loc - self.pos)**2, axis=-1)**0.5
+
+    def bounds_all(self, locs, rads):
+        return self.__bounds__(locs - self.pos, rads)
+
+    def sun_coordinates(self, pos):
+        return np.stack([
+            np.sum(pos*self.sun_x, axis=-1),
+            np.sum(pos*self.sun_y, axis=-1),
+            np.sum(pos*self.sun_z, axis=-1),
+        ], axis=-1)
+
+    @property
+    def rays(self):
+        # normalized rays of every pixel, only built when asked for
+        return self.rays_at(np.arange(self.shape[0]*self.shape[1]))
+
+    def rays_at(self, pix):
+        # normalized rays of pixels given by their indices in the view
+        rows, cols = np.divmod(np.asarray(pix).reshape((-1, 1)), self.shape[1])
+        return self.__rays__(rows + self.origin[0], cols + self.origin[1])
+
+    def ray_terms(self, rel):
+        # terms of vectors along the axes of the view, to dot them with rays of pixels
+        return np.stack([
+            np.sum(rel*self.x, axis=-1),
+            np.sum(rel*self.y, axis=-1),
+            self.screen*np.sum(rel*self.z, axis=-1),
+        ], axis=-1)
+
+    def ray_dot(self, terms, rows, cols):
+        # dot products of the rays of pixels, given by their rows and columns, with vectors given by their terms
+        x, y = self.ray_x[cols], self.ray_y[rows]
+        dot = x*terms[:,0]
+        dot += y*terms[:,1]
+        dot += terms[:,2]
+        dot /= (x**2 + y**2 + self.screen**2)**0.5
+        return dot
+
+    def origins_at(self, pix):
+        # positions the rays of pixels given by their indices start from
+        if not self.width:
+            return self.pos
+        rows, cols = np.divmod(np.asarray(pix).reshape(-1), self.shape[1])
+        return self.pos + self.width*(self.x*self.ray_x[cols,None] + self.y*self.ray_y[rows,None])
+
+    def ground_rows(self):
+        # whether the rays of each row hit the ground in front of the view
+        if self.width:
+            return (self.pos[0,-1] + self.heights)*self.z[0,-1] < 0
+        return self.heights*self.pos[0,-1] < 0
+
+    def ground_at(self, pix):
+        # positions where the rays of pixels given by their indices hit the ground
+        rows, cols = np.divmod(np.asarray(pix).reshape(-1), self.shape[1])
+        if self.width:
+            ground = self.width*self.x*self.ray_x[cols,None]
+            ground += self.ground_y[rows]
+            ground += self.pos - self.z*self.pos[0,-1]/(self.z[0,-1] or np.inf)
+            return ground
+        ground = self.x*(self.ray_x[cols]*self.ground_scale[rows])[:,None]
+        ground += self.ground_y[rows]
+        ground *= -self.pos[:,-1:]
+        ground += self.pos
+        return ground
+
+    def window(self, rows, cols):
+        view = copy.copy(self)
+        view.shape = (rows[1] - rows[0], cols[1] - cols[0]) + tuple(self.shape[2:])
+        view.origin = (self.origin[0] + rows[0], self.origin[1] + cols[0])
+        view.ray_x = self.ray_x[cols[0]:cols[1]]
+        for attr in ['ray_y', 'heights', 'ground_scale', 'ground_y']:
+            setattr(view, attr, getattr(self, attr)[rows[0]:rows[1]])
+        return view
+
     def set_sun(self, direction=None):
         if direction is None:
             direction = self.direction
-        self.direction = direction.reshape((1, 3))
+        self.direction = direction.reshape((1, 3)).astype(self.dtype)
+        unit = self.direction/np.sum(self.direction**2)**0.5
+        self.sun_x = np.cross(unit, np.eye(3, dtype=self.dtype)[np.argmin(np.abs(unit))])
+        self.sun_x /= np.sum(self.sun_x**2)**0.5
+        self.sun_y = np.cross(unit, self.sun_x)
+        self.sun_z = unit
         return self
 
     def set_view(self, *args, **kwargs):
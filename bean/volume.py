@@ -90,7 +90,9 @@ class Volume(object):
         self.depth = np.random.rand()
         self.indices = np.zeros(0, dtype=int)
         self.surface = np.zeros((0, 3))
-        self.sun_ratio = np.zeros((0, 1))
+        self.distance = np.zeros(0)
+        self.coverage = np.zeros(0)
+        self.normal = np.zeros((0, 3))
 
     def intersect_shape(self):
         return np.zeros(0, dtype=int)
@@ -102,27 +104,167 @@ class Volume(object):
         return self._apply_shape(*args, **kwargs)
 
     def project_sphere(self, view):
-        self.projected = True
-        rad = self.scale/2
+        return Volume.project_spheres([self], view)
+
+    @staticmethod
+    def sun_ratio(normal, direction):
+        # lighting of surfaces given their normals, from 0 facing the sun to 1 facing away from it
+        return (1 + np.sum(normal*direction, axis=-1))/2
+
+    @staticmethod
+    def coverage_sphere(view, rad, miss2, adj):
+        # fraction of the pixels covered by a sphere given the squared distance of their rays to its centre
+        miss = np.maximum(miss2, 0)**0.5
+        return np.clip(0.5 + (rad - miss)/(view.pixel*np.maximum(adj, 0)), 0, 1).reshape(-1)
+
+    @staticmethod
+    def sphere_locs(pos, rad, overground, view):
+        # centres of spheres, lifted above the ground when they must stay over it
+        loc = np.asarray(pos).reshape((-1, 3)).astype(view.dtype)
+        loc[overground,-1] = np.maximum(loc[overground,-1], rad[overground])
+        return loc
+
+    @staticmethod
+    def project_sphere_arrays(pos, scale, overground, view, budget=2**26):
+        # projects arrays of spheres at once by blocks of (pixel, sphere) pairs
+        rad = (np.asarray(scale)/2).astype(view.dtype)
         rad2 = rad**2
-        self.loc = self.pos.copy()
-        if self.overground:
-            self.loc[:,-1] = max(self.loc[:,-1], rad)
-        self.depth = np.sum((self.loc - view.pos)*view.z)
-        hyp2 = np.sum((self.loc - view.pos)**2, axis=-1, keepdims=True)
-        adj = np.sum((self.loc - view.pos)*view.rays, axis=-1, keepdims=True)
-        self.indices = hyp2 - adj**2 <= rad2
-        self.indices *= np.all(adj >= view.screen)
-        self.indices = np.where(self.indices)[0]
-        adj = adj[self.indices]
-        rays = view.rays[self.indices]
-        self.surface = view.pos + (adj - (rad2 - hyp2 + adj**2)**0.5)*rays
-        self.sun_ratio = (1 + np.sum((self.surface - self.loc)*view.direction, axis=-1)/rad)/2
-        if not self.overground:
-            overground = self.surface[:,-1] >= 0
-            self.indices = self.indices[overground]
-            self.surface = self.surface[overground]
-            self.sun_ratio = self.sun_ratio[overground]
+        overground = np.asarray(overground, dtype=bool)
+        loc = Volume.sphere_locs(pos, rad, overground, view)
+        if view.width:
+            return Volume.project_sphere_spans(loc, rad, overground, view)
+        rel = loc - view.pos
+        depth = np.sum(rel*view.z, axis=-1)
+        hyp2 = np.sum(rel**2, axis=-1)
+        terms = view.ray_terms(rel)
+        rows, cols = view.bounds_all(loc, rad + view.edge(loc)/2)
+        heights = rows[:,1] - rows[:,0]
+        widths = cols[:,1] - cols[:,0]
+        areas = heights*widths*view.ahead_all(loc)
+        ends = np.cumsum(areas)
+        step = max(budget//128, 1)
+        sid, pix, adj = [np.zeros(0, dtype=int)], [np.zeros(0, dtype=int)], [np.zeros(0, dtype=view.dtype)]
+        coverage = [np.zeros(0, dtype=view.dtype)]
+        for start in range(0, ends[-1] if len(ends) else 0, step):
+            stop = min(start + step, ends[-1])
+            counts = np.clip(ends, start, stop) - np.clip(ends - areas, start, stop)
+            block_sid = np.repeat(np.arange(len(loc)), counts)
+            offset = np.arange(start, stop) - ends[block_sid] + areas[block_sid]
+            row, col = np.divmod(offset, widths[block_sid])
+            row += rows[block_sid,0]
+            col += cols[block_sid,0]
+            block_pix = row*view.shape[1] + col
+            if view.mask is not None:
+                masked = view.mask[block_pix]
+                block_sid, block_pix, row, col = block_sid[masked], block_pix[masked], row[masked], col[masked]
+            block_adj = view.ray_dot(terms[block_sid], row, col)
+            if view.antialias:
+                block_coverage = Volume.coverage_sphere(
+                    view,
+                    rad[block_sid],
+                    hyp2[block_sid] - block_adj**2,
+                    block_adj,
+                )
+                covered = block_coverage > 0
+                coverage.append(block_coverage[covered])
+            else:
+                covered = hyp2[block_sid] - block_adj**2 <= rad2[block_sid]
+                coverage.append(np.ones(np.sum(covered), dtype=view.dtype))
+            sid.append(block_sid[covered])
+            pix.append(block_pix[covered])
+            adj.append(block_adj[covered])
+        sid, pix, coverage = np.concatenate(sid), np.concatenate(pix), np.concatenate(coverage)
+        adj = np.concatenate(adj).reshape((-1, 1))
+        distance = adj - np.maximum(rad2[sid,None] - hyp2[sid,None] + adj**2, 0)**0.5
+        surface = view.pos + distance*view.rays_at(pix)
+        distance = distance[:,0]
+        normal = (surface - loc[sid])/rad[sid,None]
+        keep = overground[sid] + (surface[:,-1] >= 0)
+        sid, pix, surface, normal = sid[keep], pix[keep], surface[keep], normal[keep]
+        distance, coverage = distance[keep], coverage[keep]
+        return {
+            'loc' : loc,
+            'depth' : depth,
+            'sid' : sid,
+            'indices' : pix,
+            'surface' : surface,
+            'distance' : distance,
+            'coverage' : coverage,
+            'normal' : normal,
+        }
+
+    @staticmethod
+    def project_sphere_spans(loc, rad, overground, view):
+        # projects spheres on an orthographic view by spans of rows, every ray going along z from its own origin
+        rel = loc - view.pos
+        depth = np.sum(rel*view.z, axis=-1)
+        across = np.sum(rel*view.x, axis=-1)/view.width
+        up = np.sum(rel*view.y, axis=-1)/view.width
+        reach = rad + view.edge(loc)/2
+        rows, cols = view.bounds_all(loc, reach)
+        heights = (rows[:,1] - rows[:,0])*view.ahead_all(loc)
+        span_sid = np.repeat(np.arange(len(loc)), heights)
+        span_row = np.arange(len(span_sid)) - np.repeat(np.cumsum(heights) - heights, heights) + rows[span_sid,0]
+        span_dy = up[span_sid] - view.ray_y[span_row]
+        reach2 = (reach[span_sid]/view.width)**2
+        chord = np.where(span_dy**2 <= reach2, np.maximum(reach2 - span_dy**2, 0)**0.5, -1)
+        step = view.frame[1] - 1
+        first = np.ceil((across[span_sid] - chord + 0.5)*step).astype(int) - view.origin[1]
+        last = np.floor((across[span_sid] + chord + 0.5)*step).astype(int) + 1 - view.origin[1]
+        first, last = np.clip(first, 0, view.shape[1]), np.clip(last, 0, view.shape[1])
+        lengths = np.maximum(last - first, 0)
+        span = np.repeat(np.arange(len(span_sid)), lengths)
+        col = np.arange(len(span)) - np.repeat(np.cumsum(lengths) - lengths, lengths) + first[span]
+        row, sid = span_row[span], span_sid[span]
+        pix = row*view.shape[1] + col
+        if view.mask is not None:
+            masked = view.mask[pix]
+            span, col, row, sid, pix = span[masked], col[masked], row[masked], sid[masked], pix[masked]
+        miss2 = (across[sid] - view.ray_x[col])**2
+        miss2 += span_dy[span]**2
+        miss2 *= view.width**2
+        if view.antialias:
+            coverage = np.clip(0.5 + (rad[sid] - np.maximum(miss2, 0)**0.5)/view.pixel, 0, 1)
+        else:
+            coverage = (miss2 <= rad[sid]**2).astype(view.dtype)
+        covered = coverage > 0
+        sid, pix, row, col, coverage = sid[covered], pix[covered], row[covered], col[covered], coverage[covered]
+        distance = depth[sid] - np.maximum(rad[sid]**2 - miss2[covered], 0)**0.5
+        surface = view.pos + view.width*(view.x*view.ray_x[col,None] + view.y*view.ray_y[row,None])
+        surface += distance[:,None]*view.z
+        normal = (surface - loc[sid])/rad[sid,None]
+        keep = overground[sid] + (surface[:,-1] >= 0)
+        return {
+            'loc' : loc,
+            'depth' : depth,
+            'sid' : sid[keep],
+            'indices' : pix[keep],
+            'surface' : surface[keep],
+            'distance' : distance[keep],
+            'coverage' : coverage[keep],
+            'normal' : normal[keep],
+        }
+
+    @staticmethod
+    def project_spheres(volumes, view, budget=2**26):
+        # projects several spheres at once by blocks of (pixel, sphere) pairs
+        if not volumes:
+            return
+        projection = Volume.project_sphere_arrays(
+            np.concatenate([volume.pos for volume in volumes]),
+            np.array([volume.scale for volume in volumes]),
+            np.array([volume.overground for volume in volumes]),
+            view,
+            budget,
+        )
+        splits = np.cumsum(np.bincount(projection['sid'], minlength=len(volumes)))[:-1]
+        for index, volume in enumerate(volumes):
+            volume.projected = True
+            volume.loc = projection['loc'][index:index + 1]
+            volume.depth = projection['depth'][index]
+        for name in ['indices', 'surface', 'distance', 'coverage', 'normal']:
+            for volume, values in zip(volumes, np.split(projection[name], splits)):
+                setattr(volume, name, values)
 
     def intersect_sphere(self, pos, rays):
         rad2 = (self.scale/2)**2
@@ -8,7 +8,8 @@ setuptools.setup(
     version="0.0.1",
     author="Benoit Corsini",
     author_email="benoitcorsini@gmail.com",
-    packages=["bean"],
+    packages=["bean", "bean.bench"],
+    package_data={"bean.bench": ["*.json"]},
     description="A Python package for creating videos.",
     long_description=description,
     long_description_content_type="text/markdown",
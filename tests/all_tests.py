@@ -4,6 +4,8 @@ from canvas import CanvasTests
 from brush import BrushTests
 from volume import VolumeTests
 from motion import MotionTests
+from mold import MoldTests
+from bench import BenchTests
 
 
 if __name__ == '__main__':
@@ -0,0 +1,50 @@
+import sys
+import os.path as osp
+import tempfile
+import unittest
+
+sys.path.append('.')
+
+from bean.bench import MoldBench
+
+
+class BenchTests(unittest.TestCase):
+
+    def test_scenes(self):
+        bench = MoldBench(spheres=[1, 10], dpi=10, opacity=['opaque'])
+        scenes = bench.scenes()
+        self.assertEqual(len(scenes), 2*len(MoldBench.draft)*len(MoldBench.shadows))
+        self.assertEqual(len(set(map(bench._name, scenes))), len(scenes))
+        self.assertTrue(all(scene['dpi'] == 10 for scene in scenes))
+
+    def test_run(self):
+        bench = MoldBench(spheres=[3], dpi=[10], opacity=['translucent'], shadows=[1], repeat=1, runs=1)
+        with tempfile.TemporaryDirectory() as directory:
+            bench.baseline = osp.join(directory, 'mold.json')
+            results = bench.run(verbose=False)
+            for result in results.values():
+                self.assertGreater(result['ms'], 0)
+                self.assertIn('project_molds', result['stages'])
+            bench.save(results)
+            self.assertEqual(bench.load(), results)
+            ratios = bench.compare(results)
+            self.assertEqual(ratios, dict.fromkeys(results, 1))
+            self.assertEqual(bench.regressions(results), [])
+            for before, after, regressions in [
+                    (1, 1.5, []),
+                    (100, 110, []),
+                    (1, 2 + bench.floor, list(results))]:
+                baseline = {name : {'ms' : before} for name in results}
+                slower = {name : {'ms' : after} for name in results}
+                self.assertEqual(bench.regressions(slower, baseline), regressions)
+            names = [f'scene{index}' for index in range(bench.drift_scenes)]
+            baseline = {name : {'ms' : 10} for name in names}
+            slower = {name : {'ms' : 20} for name in names}
+            self.assertEqual(bench.drift(bench.compare(slower, baseline)), 2)
+            self.assertEqual(bench.regressions(slower, baseline), [])
+            slower[names[0]]['ms'] = 40
+            self.assertEqual(bench.regressions(slower, baseline), names[:1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,616 @@
+import sys
+import unittest
+import numpy as np
+import numpy.random as npr
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+sys.path.append('.')
+
+from bean import Mold
+from bean.view import View
+from bean.volume import Volume
+
+
+class MoldTests(unittest.TestCase):
+
+    '''
+    hidden methods
+    '''
+
+    @staticmethod
+    def _full_frame_sphere(volume, view):
+        # projects a sphere against every ray of the view
+        rad2 = (volume.scale/2)**2
+        hyp2 = np.sum((volume.loc - view.pos)**2, axis=-1, keepdims=True)
+        adj = np.sum((volume.loc - view.pos)*view.rays, axis=-1, keepdims=True)
+        indices = hyp2 - adj**2 <= rad2
+        indices *= np.all(adj >= view.screen)
+        return np.where(indices)[0]
+
+    @staticmethod
+    def _random_scene(n_molds=20, seed=0, dpi=20, **kwargs):
+        # creates a mold with random spheres
+        ml = Mold(figsize=(4, 3), dpi=dpi, **kwargs)
+        npr.seed(seed)
+        for index in range(n_molds):
+            ml.new_sphere(
+                pos=(4*npr.rand() - 2, 4*npr.rand() - 1, npr.rand()),
+                scale=0.2 + 0.6*npr.rand(),
+                colour=ml.hsl(npr.rand()),
+                opacity=1 if index % 3 else 0.5,
+            )
+        return ml
+
+    '''
+    volume methods
+    '''
+
+    def test_sphere_bounds(self):
+        npr.seed(0)
+        for rotation in [0, 30, 135, 270]:
+            for angle in [None, -20, -60]:
+                view = View(
+                    shape=(31, 41, 4),
+                    dist=4,
+                    height=3,
+                    angle=angle,
+                    shift=0,
+                    rotation=rotation,
+                    screen=2,
+                    scale=1,
+                )
+                for _ in range(20):
+                    volume = Volume.Sphere(
+                        pos=8*npr.rand(3) - 4,
+                        scale=0.1 + 2*npr.rand(),
+                    )
+                    volume.project(view)
+                    self.assertTrue(np.array_equal(
+                        volume.indices,
+                        self._full_frame_sphere(volume, view),
+                    ))
+
+    def test_project_spheres(self):
+        npr.seed(1)
+        view = View(
+            shape=(41, 61, 4),
+            dist=4,
+            height=3,
+            angle=None,
+            shift=0,
+            rotation=20,
+            screen=2,
+            scale=1,
+        )
+        kwargs = [
+            {
+                'pos' : 8*npr.rand(3) - 4,
+                'scale' : 0.1 + npr.rand(),
+                'overground' : npr.rand() < 0.5,
+            }
+            for _ in range(50)
+        ]
+        for antialias in [False, True]:
+            view.antialias = antialias
+            singles = [Volume.Sphere(**kwarg) for kwarg in kwargs]
+            for volume in singles:
+                volume.project(view)
+            for budget in [0, 2**12, 2**26]:
+                batched = [Volume.Sphere(**kwarg) for kwarg in kwargs]
+                Volume.project_spheres(batched, view, budget)
+                for single, volume in zip(singles, batched):
+                    self.assertTrue(volume.projected)
+                    self.assertEqual(single.depth, volume.depth)
+                    self.assertTrue(np.array_equal(single.loc, volume.loc))
+                    self.assertTrue(np.array_equal(single.indices, volume.indices))
+                    self.assertTrue(np.array_equal(single.surface, volume.surface))
+                    self.assertTrue(np.array_equal(single.coverage, volume.coverage))
+                    self.assertTrue(np.array_equal(single.normal, volume.normal))
+
+    def test_separable_rays(self):
+        npr.seed(2)
+        view = View(
+            shape=(31, 41, 4),
+            dist=4,
+            height=3,
+            angle=None,
+            shift=1,
+            rotation=30,
+            screen=2,
+            scale=1,
+        )
+        rays = view.rays
+        self.assertTrue(np.allclose(np.sum(rays**2, axis=-1), 1))
+        rel = 8*npr.rand(50, 3) - 4
+        pix = npr.randint(len(rays), size=50)
+        rows, cols = np.divmod(pix, view.shape[1])
+        self.assertTrue(np.allclose(
+            view.ray_dot(view.ray_terms(rel), rows, cols),
+            np.sum(rel*rays[pix], axis=-1),
+        ))
+        down = np.repeat(view.heights < 0, view.shape[1])
+        self.assertTrue(np.array_equal(down, rays[:,-1] < 0))
+        ground = view.ground_at(np.flatnonzero(down))
+        self.assertTrue(np.allclose(ground[:,-1], 0))
+        self.assertTrue(np.allclose(np.cross(ground - view.pos, rays[down]), 0))
+        window = view.window((5, 20), (10, 30))
+        self.assertTrue(np.array_equal(
+            window.rays,
+            rays.reshape((31, 41, 3))[5:20,10:30].reshape((-1, 3)),
+        ))
+
+    def test_view_cache(self):
+        view = View(shape=(31, 41, 4), dist=4, height=3, angle=-30, shift=0, rotation=0, screen=2, scale=1)
+        grid = view.ray_x
+        view.set_view(dist=6, height=2, shift=1)
+        self.assertIs(view.ray_x, grid)
+        fresh = View(shape=(31, 41, 4), dist=6, height=2, angle=-30, shift=1, rotation=0, screen=2, scale=1)
+        pix = np.arange(0, 31*41, 7)
+        self.assertTrue(np.allclose(view.ground_at(pix), fresh.ground_at(pix)))
+        for rotation in range(1, view.cache_size + 1):
+            view.set_view(rotation=rotation)
+        self.assertEqual(len(view.grids), view.cache_size)
+        view.set_view(rotation=0)
+        self.assertIsNot(view.ray_x, grid)
+        self.assertTrue(np.array_equal(view.ground_y, fresh.ground_y))
+
+    def test_orthographic(self):
+        npr.seed(3)
+        for rotation, angle in [(0, None), (30, -20), (135, -90)]:
+            view = View(
+                shape=(31, 41, 4),
+                dist=4,
+                height=3,
+                angle=angle,
+                shift=0,
+                rotation=rotation,
+                screen=2,
+                scale=1,
+                ortho=6,
+            )
+            origins = view.origins_at(np.arange(31*41))
+            self.assertTrue(np.allclose(view.rays, view.z))
+            for _ in range(20):
+                volume = Volume.Sphere(pos=8*npr.rand(3) - 4, scale=0.1 + 2*npr.rand())
+                volume.project(view)
+                rel = volume.loc - origins
+                adj = np.sum(rel*view.z, axis=-1)
+                miss2 = np.sum(rel**2, axis=-1) - adj**2
+                hit = (miss2 <= (volume.scale/2)**2)*(volume.depth >= 0)
+                surface = origins - (np.maximum((volume.scale/2)**2 - miss2, 0)**0.5 - adj)[:,None]*view.z
+                hit *= surface[:,-1] >= 0
+                self.assertTrue(np.array_equal(volume.indices, np.where(hit)[0]))
+            down = np.repeat(view.ground_rows(), view.shape[1])
+            self.assertTrue(np.allclose(view.ground_at(np.flatnonzero(down))[:,-1], 0))
+        ml = self._random_scene(view_ortho=6)
+        ml.show()
+        self.assertGreater(np.sum(ml._matrix[:,-1] > 0), 0)
+        ml.set_view(ortho=0)
+        self.assertEqual(ml.view_ortho, 0)
+        ml.show()
+        perspective = self._random_scene()
+        perspective.show()
+        self.assertTrue(np.array_equal(ml._matrix, perspective._matrix))
+
+    def test_shade_pairs(self):
+        ml = self._random_scene(n_molds=40)
+        ml._project_molds()
+        ml._shade_pairs()
+        for receiver in ml._molds.values():
+            row = ml._molds.rows[receiver['key']]
+            casters = [ml._molds.names[caster] for caster in ml._pairs[0][ml._pairs[1] == row]]
+            self.assertFalse(receiver['key'] in casters)
+            for caster in ml._molds.values():
+                if caster['key'] in casters or caster['key'] == receiver['key']:
+                    continue
+                self.assertEqual(len(caster['volume'].intersect(
+                    receiver['volume'].surface,
+                    ml._view.direction,
+                )), 0)
+
+    def test_ellipse_shades(self):
+        for direction in [(0, 0, -1), (1, 2, -1), (-3, 0.5, -1)]:
+            ml = self._random_scene(n_molds=40)
+            ml.set_sun(ml.unitary(direction))
+            ml._project_molds()
+            maybe_shade = ml._view.rays[:,-1] < 0
+            rays = ml._view.rays[maybe_shade]
+            pos = ml._view.pos - rays*ml._view.pos[:,-1:]/rays[:,-1:]
+            shades = np.zeros(len(pos))
+            ml._ellipse_shades(shades, maybe_shade, pos)
+            expected = np.zeros(len(pos))
+            for mold in ml._molds.values():
+                shaded = mold['volume'].intersect(pos, ml._view.direction)
+                expected[shaded] = 1 - (1 - expected[shaded])*(1 - mold['opacity'])
+            self.assertTrue(np.array_equal(shades, expected))
+
+    def test_zbuffer(self):
+        matrices = []
+        for zbuffer in [False, True]:
+            ml = Mold(figsize=(4, 3), dpi=20, zbuffer=zbuffer)
+            for index in range(5):
+                ml.new_sphere(
+                    pos=(index - 2, 2),
+                    scale=0.8,
+                    opacity=1 if index % 2 else 0.5,
+                )
+            ml.show()
+            matrices.append(ml._matrix)
+        self.assertTrue(np.array_equal(*matrices))
+        ml.new_sphere(key='big', pos=(0, 0.5), scale=1.2)
+        ml.new_sphere(key='small', pos=(0.3, 0.2, 0.3), scale=0.8)
+        ml._project_molds()
+        big = ml._molds['big']['volume']
+        small = ml._molds['small']['volume']
+        common, in_big, in_small = np.intersect1d(
+            big.indices,
+            small.indices,
+            return_indices=True,
+        )
+        nearer = big.distance[in_big] < small.distance[in_small]
+        self.assertTrue(np.any(nearer) and not np.all(nearer))
+        ml._plot_molds()
+        zbuffer = ml._matrix.copy()
+        ml.zbuffer = False
+        ml._plot_molds()
+        self.assertTrue(np.array_equal(
+            zbuffer[common[~nearer]],
+            ml._matrix[common[~nearer]],
+        ))
+        self.assertFalse(np.array_equal(
+            zbuffer[common[nearer]],
+            ml._matrix[common[nearer]],
+        ))
+
+    def test_premultiplied(self):
+        matrices = {}
+        for keys in [('front',), ('back',), ('front', 'back')]:
+            ml = Mold(figsize=(4, 3), dpi=20, shadows=False)
+            for key, pos, colour, opacity in [
+                    ('front', (0, 0.5, 0.5), ml.hsl(0.1), 0.5),
+                    ('back', (0.3, 1.5, 0.5), ml.hsl(0.6), 0.3)]:
+                if key in keys:
+                    ml.new_sphere(key=key, pos=pos, scale=1.2, colour=colour, opacity=opacity)
+            ml.show()
+            matrices[keys] = ml._matrix
+        front, back, both = matrices[('front',)], matrices[('back',)], matrices[('front', 'back')]
+        self.assertTrue(np.allclose(both, front + (1 - front[:,-1:])*back))
+        overlap = np.isclose(front[:,-1], 0.5)*np.isclose(back[:,-1], 0.3)
+        self.assertTrue(np.any(overlap))
+        self.assertTrue(np.allclose(both[overlap,-1], 1 - (1 - 0.5)*(1 - 0.3)))
+        matrices = []
+        for shadows in [False, True]:
+            ml = Mold(figsize=(4, 3), dpi=20, shadows=shadows)
+            ml._shade_opacity = 0.4
+            ml.set_sun(ml.unitary((1, 1, -1)))
+            ml.new_sphere(pos=(0, 0.5, 0.5), scale=1.2, opacity=0.5)
+            ml.show()
+            matrices.append(ml._matrix)
+        maybe_shade = np.repeat(ml._view.ground_rows(), ml._view.shape[1])
+        shades = np.zeros(np.sum(maybe_shade))
+        ml._ellipse_shades(shades, maybe_shade, ml._view.ground_at(np.flatnonzero(maybe_shade)))
+        shade = np.zeros(len(ml._matrix))
+        shade[maybe_shade] = ml._shade_opacity*shades
+        alpha = matrices[0][:,-1]
+        self.assertTrue(np.any((alpha > 0)*(alpha < 1)*(shade > 0)))
+        self.assertTrue(np.allclose(matrices[1][:,-1], 1 - (1 - alpha)*(1 - shade)))
+        self.assertTrue(np.allclose(matrices[1][:,:-1], matrices[0][:,:-1]))
+
+    def test_shade_lut(self):
+        for render_dtype in ['float64', 'float32']:
+            ml = Mold(figsize=(4, 3), dpi=20, render_dtype=render_dtype)
+            colours = [ml.hsl(0.2), ml.hsl(0.7, lightness=0.3)]
+            table = np.stack([ml._lut(colour) for colour in colours])
+            self.assertEqual(table.dtype, np.dtype(render_dtype))
+            values = np.concatenate([
+                np.linspace(-0.5, 1.5, 1001),
+                np.arange(table.shape[1] + 1)/table.shape[1],
+                [-np.inf, np.inf],
+            ]).astype(render_dtype)
+            luts = np.arange(len(values)) % len(colours)
+            gathered = ml._shade_lut(table, luts, values)
+            for index, colour in enumerate(colours):
+                cmap = ml.cmap([ml._sun_colour, colour, 'black'])
+                expected = cmap(values[luts == index]).astype(render_dtype)
+                self.assertTrue(np.array_equal(gathered[luts == index], expected))
+
+    def test_render_dtype(self):
+        matrices = {}
+        for render_dtype in ['float64', 'float32']:
+            ml = self._random_scene(n_molds=30, render_dtype=render_dtype)
+            ml.show()
+            self.assertEqual(ml._matrix.dtype, np.dtype(render_dtype))
+            self.assertEqual(ml._view.rays.dtype, np.dtype(render_dtype))
+            for mold in ml._molds.values():
+                self.assertEqual(mold['volume'].surface.dtype, np.dtype(render_dtype))
+            matrices[render_dtype] = ml._avg_mat(ml._matrix.reshape(ml._matrix_shape))
+        error = np.max(np.abs(matrices['float64'] - matrices['float32']), axis=-1)
+        self.assertLess(np.mean(error), 1e-4)
+        self.assertLess(np.mean(error > 1e-2), 1e-3)
+
+    def test_antialias(self):
+        alphas = {}
+        for dpi, antialias in [(10, False), (10, True), (80, False)]:
+            ml = self._random_scene(n_molds=8, dpi=dpi, antialias=antialias)
+            ml._shade_opacity = 0
+            ml.show()
+            alphas[dpi, antialias] = ml._matrix[:,-1].reshape(ml._matrix_shape[:2])
+        high = np.pad(alphas[80, False], 4, mode='edge')
+        height, width = alphas[10, False].shape
+        reference = high[:8*height,:8*width].reshape((height, 8, width, 8)).mean(axis=(1, 3))
+        errors = {
+            antialias : np.mean(np.abs(alphas[10, antialias] - reference))
+            for antialias in [False, True]
+        }
+        self.assertLess(2*errors[True], errors[False])
+
+    def test_shadow_map(self):
+        matrices = []
+        for shadow_map in [0, 256]:
+            ml = self._random_scene(n_molds=40, shadow_map=shadow_map)
+            ml.show()
+            matrices.append(ml._avg_mat(ml._matrix.reshape(ml._matrix_shape)))
+        self.assertEqual(len(ml._shadows), 1)
+        error = np.max(np.abs(matrices[0] - matrices[1]), axis=-1)
+        self.assertLess(np.mean(error), 1e-2)
+        self.assertLess(np.mean(error > 0.1), 1e-2)
+
+    '''
+    main methods
+    '''
+
+    def test_new_spheres(self):
+        single = self._random_scene(n_molds=40)
+        single.show()
+        npr.seed(0)
+        params = np.array([
+            (4*npr.rand() - 2, 4*npr.rand() - 1, npr.rand(), 0.2 + 0.6*npr.rand(), npr.rand())
+            for _ in range(40)
+        ])
+        bulk = Mold(figsize=(4, 3), dpi=20)
+        bulk.new_spheres(
+            pos=params[:,:3],
+            scale=params[:,3],
+            colour=[bulk.hsl(hue) for hue in params[:,4]],
+            opacity=np.where(np.arange(40) % 3, 1, 0.5),
+        )
+        bulk.show()
+        self.assertTrue(np.array_equal(single._matrix, bulk._matrix))
+        self.assertEqual(list(bulk._molds), list(single._molds))
+        self.assertEqual(len(bulk._molds.luts), 40)
+        mold = bulk._molds['mold3']
+        self.assertEqual(mold['opacity'], 0.5)
+        self.assertTrue(np.array_equal(mold['volume'].pos, params[3:4,:3]))
+        mold['volume'].move(None, (0, 0, 1))
+        self.assertEqual(bulk._molds.pos[3,2], params[3,2] + 1)
+        self.assertFalse(bulk._molds.projected[3])
+        mold['volume'].project(bulk._view)
+        self.assertTrue(bulk._molds.projected[3])
+        volume = Volume.Sphere(pos=mold['volume'].pos, scale=mold['volume'].scale)
+        volume.project(bulk._view)
+        self.assertTrue(np.array_equal(mold['volume'].indices, volume.indices))
+        self.assertTrue(np.array_equal(mold['volume'].surface, volume.surface))
+        self.assertTrue(np.array_equal(bulk._molds['mold4']['volume'].indices, single._molds['mold4']['volume'].indices))
+        bulk.new_spheres(pos=np.zeros((2, 2)), key=['first', 'second'])
+        self.assertEqual(len(bulk._molds), 42)
+        self.assertTrue(np.array_equal(bulk._molds['second']['volume'].pos, np.zeros((1, 3))))
+        with self.assertRaises(UserWarning):
+            bulk.new_spheres(pos=np.zeros((2, 3)), key=['third', 'third'])
+        bulk.new_spheres(pos=(1, 2, 3), key='single')
+        self.assertEqual(len(bulk._molds), 43)
+        self.assertTrue(np.array_equal(bulk._molds['single']['volume'].pos, [[1, 2, 3]]))
+        for kwargs in [
+            {'key' : ['third', 'fourth']},
+            {'colour' : [bulk.hsl(0.1), bulk.hsl(0.2)]},
+            {'key' : 'third'},
+        ]:
+            with self.assertRaises(UserWarning):
+                bulk.new_spheres(pos=np.zeros((3, 3)), **kwargs)
+        with self.assertRaises(UserWarning):
+            bulk.new_spheres(pos=np.zeros((2, 4)))
+        self.assertEqual(len(bulk._molds), 43)
+        index = bulk._mold_index
+        with self.assertRaises(UserWarning):
+            bulk.new_spheres(pos=np.zeros((2, 3)), key=[None, 'first'])
+        self.assertEqual(bulk._mold_index, index)
+        bulk.new_spheres(pos=[[0, 1, 0]], key=5)
+        bulk.new_spheres(pos=[[0, 1, 0]], key=('tuple', 1))
+        self.assertEqual(list(bulk._molds)[-2:], [5, ('tuple', 1)])
+
+    def test_particles(self):
+        ml = Mold(figsize=(4, 3), dpi=20, shadow_map=64)
+        ml.new_sphere(pos=(0, 1, 0), scale=0.5)
+        ml.show()
+        empty = ml._matrix.copy()
+        ml.new_emitter(pos=(0, 1, 0.3), rate=600, lifetime=0.5, scale=0.05, seed=0)
+        emitter = ml._emitters['emitter0']
+        for _ in range(30):
+            ml.advance(1/30)
+        self.assertEqual(len(emitter), 300)
+        self.assertLess(np.max(emitter.particles['age']), 0.5)
+        self.assertEqual(len(ml._molds), 1)
+        self.assertEqual(ml._molds.size, 301)
+        opacity = ml._molds.opacity[1:]
+        self.assertTrue(np.allclose(opacity, 1 - emitter.particles['age']/0.5))
+        ml.show()
+        self.assertFalse(np.array_equal(ml._matrix, empty))
+        ml._shade_pairs()
+        self.assertTrue(np.all(np.concatenate(ml._pairs) < len(ml._molds)))
+        ml.new_sphere(pos=(1, 1, 0), scale=0.5)
+        self.assertEqual(list(ml._molds), ['mold0', 'mold1'])
+        self.assertEqual(ml._molds.size, 302)
+        self.assertTrue(np.array_equal(ml._molds.pos[2:], emitter.particles['pos']))
+
+    def test_threads(self):
+        matrices = []
+        for threads in [1, 3]:
+            ml = self._random_scene(threads=threads)
+            searches = []
+            find_pairs = ml._find_pairs
+            ml._find_pairs = lambda *args: searches.append(args) or find_pairs(*args)
+            ml.show()
+            self.assertEqual(len(searches), 1)
+            matrices.append(ml._matrix)
+        self.assertTrue(np.array_equal(*matrices))
+
+    def test_processes(self):
+        matrices = []
+        for processes in [1, 2]:
+            ml = self._random_scene(processes=processes)
+            ml.show()
+            matrices.append(ml._matrix.copy())
+            ml.set_view(rotation=30)
+            ml.show()
+            matrices.append(ml._matrix.copy())
+        self.assertTrue(np.array_equal(matrices[0], matrices[2]))
+        self.assertTrue(np.array_equal(matrices[1], matrices[3]))
+        ml = self._random_scene(processes=2, stats=True)
+        ml.show()
+        self.assertEqual(ml.frame_stats['stages']['shade_pairs']['calls'], 1)
+
+    def test_memory_budget(self):
+        ml = self._random_scene()
+        ml.show()
+        full = ml._avg_mat(ml._matrix.reshape(ml._matrix_shape))
+        ml = self._random_scene(memory_budget=2**16)
+        ml.show()
+        self.assertNotIn('rays', vars(ml._view))
+        self.assertLess(len(ml._block), len(ml._matrix))
+        self.assertTrue(np.array_equal(ml._avg_chunks(), full))
+
+    def test_progressive(self):
+        ml = self._random_scene(dpi=40)
+        ml.show()
+        full = ml._avg_mat(ml._matrix.reshape(ml._matrix_shape))
+        for progressive in [1, 3]:
+            ml = self._random_scene(dpi=40, progressive=progressive)
+            errors = []
+            for refine in [False, True]:
+                ml.show(refine)
+                matrix = ml._avg_mat(ml._matrix.reshape(ml._matrix_shape))
+                errors.append(np.mean(np.max(np.abs(matrix - full), axis=-1)))
+            self.assertLess(errors[1], errors[0])
+            self.assertLess(errors[1], 1e-3)
+            self.assertFalse(any(mold['volume'].projected for mold in ml._molds.values()))
+
+    def test_dirty(self):
+        for shadow_map in [0, 64]:
+            ml = self._random_scene(shadow_map=shadow_map)
+            ml.show()
+            for index in range(4):
+                ml._molds[f'mold{index}']['volume'].move(None, (0.1, 0.05, 0.02))
+                ml._molds[f'mold{index + 5}']['opacity'] = 0.3
+                if index == 3:
+                    ml._molds['mold10']['lut'] = ml._lut(ml.hsl(0.5))
+                dirty = ml._render_dirty()
+                self.assertEqual(dirty, not shadow_map)
+                if not dirty:
+                    ml._plot_molds()
+                ml._store_footprints()
+                full = self._random_scene(shadow_map=shadow_map)
+                for key, mold in ml._molds.items():
+                    full._molds[key]['volume'].pos = mold['volume'].pos.copy()
+                    full._molds[key]['opacity'] = mold['opacity']
+                    full._molds[key]['lut'] = mold['lut']
+                full.show()
+                self.assertTrue(np.array_equal(ml._matrix, full._matrix))
+            ml._molds['mold11']['lut'] = ml._lut(ml.hsl(0.7))
+            searches = []
+            find_pairs = ml._find_pairs
+            ml._find_pairs = lambda *args: searches.append(args) or find_pairs(*args)
+            self.assertTrue(ml._render_dirty())
+            self.assertEqual(len(searches), 0)
+            ml.set_sun(np.array([0, 0.5, -1]))
+            self.assertFalse(ml._render_dirty())
+
+    def test_stats(self):
+        ml = self._random_scene()
+        ml.show()
+        self.assertIsNone(ml.frame_stats)
+        frames = []
+        ml = self._random_scene(stats=True, stats_hook=frames.append)
+        ml.show()
+        self.assertEqual(frames, [ml.frame_stats])
+        stages = ml.frame_stats['stages']
+        names = ['project_molds', 'shade_pairs', 'overshade', 'add_to_matrix', 'plot_shades', 'avg_mat', 'set_data']
+        for stage in names:
+            self.assertGreater(stages[stage]['calls'], 0)
+            self.assertGreaterEqual(stages[stage]['time'], 0)
+        pixels = [len(mold['volume'].indices) for mold in ml._molds.values()]
+        self.assertEqual(stages['project_molds']['pixels'], sum(pixels))
+        self.assertEqual(stages['project_molds']['culled'], pixels.count(0))
+        self.assertLessEqual(stages['overshade']['pixels'], sum(pixels))
+        self.assertEqual(stages['shade_pairs']['molds'], len(pixels))
+        self.assertIsNone(ml._stats)
+        ml = self._random_scene(stats=True, processes=2)
+        ml.show()
+        shared = ml.frame_stats['stages']
+        for stage in names:
+            self.assertGreater(shared[stage]['calls'], 0)
+        self.assertEqual(shared['project_molds']['pixels'], sum(pixels))
+
+    def test_set_sun(self):
+        direction = (-1, 0.5, -0.5)
+        ml = self._random_scene(stats=True)
+        ml.show()
+        ml.set_sun(ml.unitary(direction))
+        ml.show()
+        self.assertEqual(ml.frame_stats['stages']['project_molds']['pixels'], 0)
+        fresh = self._random_scene(sun_direction=direction)
+        fresh.show()
+        self.assertTrue(np.array_equal(ml._matrix, fresh._matrix))
+
+    def test_render_views(self):
+        views = [{'rotation' : rotation} for rotation in [0, 40, 80]] + [{'shift' : -0.1}, {'shift' : 0.1}]
+        ml = self._random_scene(n_molds=30)
+        ml.show()
+        before = ml._matrix.copy()
+        frames = ml.render_views(views)
+        self.assertEqual(len(ml._shade_cache), 1)
+        self.assertEqual(ml.view_rotation, 0)
+        ml.new_sphere(pos=(0, 1, 1), scale=0.3)
+        ml.show()
+        self.assertFalse(np.array_equal(ml._matrix, before))
+        for params, frame in zip(views, frames):
+            single = self._random_scene(n_molds=30)
+            single.set_view(**params)
+            self.assertTrue(np.array_equal(frame, single.render_array()))
+        fresh = self._random_scene(n_molds=30)
+        fresh.new_sphere(pos=(0, 1, 1), scale=0.3)
+        fresh.show()
+        self.assertTrue(np.array_equal(ml._matrix, fresh._matrix))
+
+    def test_render_array(self):
+        for transparent, facecolor, axis in [(False, 'white', False), (True, 'white', False),
+                                             (False, 'black', False), (False, (0.2, 0.3, 0.8), True)]:
+            ml = self._random_scene(copyright_on=True)
+            ml.fig.set_facecolor(facecolor)
+            if axis:
+                ml.ax.set_axis_on()
+                ml.ax.set_facecolor((0.9, 0.5, 0.1))
+            frame = ml.render_array(transparent=transparent)
+            self.assertEqual(frame.shape, (60, 80, 4))
+            self.assertEqual(frame.dtype, np.uint8)
+            ml.show()
+            if transparent:
+                ml.fig.set_facecolor((0, 0, 0, 0))
+            canvas = FigureCanvasAgg(ml.fig)
+            canvas.draw()
+            drawn = np.asarray(canvas.buffer_rgba()).astype(int)
+            self.assertTrue(np.array_equal(frame[:,:,-1] > 0, drawn[:,:,-1] > 0))
+            error = np.abs(frame.astype(int) - drawn)*(drawn[:,:,-1:] > 0)
+            self.assertLess(np.mean(error), 1)
+        stamped = self._random_scene(copyright_on=True).render_array()
+        self.assertFalse(np.array_equal(self._random_scene().render_array(), stamped))
+
+    def test_show(self):
+        ml = self._random_scene()
+        ml.show()
+        self.assertEqual(ml._matrix.shape, (61*81, 4))
+        self.assertTrue(np.all(ml._matrix >= 0))
+        self.assertTrue(np.all(ml._matrix <= 1))
+        self.assertTrue(np.any(ml._matrix[:,-1] > 0))
+
+
+if __name__ == '__main__':
+    unittest.main()